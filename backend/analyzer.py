@@ -6,15 +6,30 @@ talent scores, metrics, and hiring recommendations using Gemini.
 """
 
 import os
+import io
+import copy
 import json
-import base64
 import time
 import re
-from typing import List, Dict, Optional
+import random
+import hashlib
+import mmap
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, List, Dict, Optional, Tuple
 
+import httpx
+import orjson
 from google import genai
 from google.genai import types
+from google.genai import errors as genai_errors
 from dotenv import load_dotenv
+from PIL import Image
+
+from llm_cache import CACHE_DIR, DiskCache
 
 load_dotenv()
 
@@ -25,41 +40,249 @@ def _clean_env(key, default=""):
 
 # Explicitly pass API key — the SDK defaults to GOOGLE_API_KEY, not GEMINI_API_KEY
 _api_key = _clean_env("GEMINI_API_KEY") or _clean_env("GOOGLE_API_KEY")
-gemini_client = genai.Client(api_key=_api_key)
+
+
+def _http_client_args() -> Dict:
+    """Keep-alive pool sized for the vision/designer fan-out; HTTP/2 when httpx's h2 extra is installed."""
+    args = {"limits": httpx.Limits(max_connections=64, max_keepalive_connections=32)}
+    try:
+        import h2  # noqa: F401
+        args["http2"] = True
+    except ImportError:
+        pass
+    return args
+
+
+@lru_cache(maxsize=1)
+def get_gemini_client() -> genai.Client:
+    """
+    The one client (and so one connection pool) shared by every thread,
+    built on first use so importing this module doesn't construct it.
+    """
+    return genai.Client(
+        api_key=_api_key,
+        http_options=types.HttpOptions(timeout=120_000, client_args=_http_client_args()),
+    )
+
+
 GEMINI_VISION_MODEL = _clean_env("GEMINI_VISION_MODEL", "gemini-2.5-flash")
 GEMINI_ASSESSMENT_MODEL = _clean_env("GEMINI_ASSESSMENT_MODEL", "gemini-2.5-flash")
 
+# Request budget for Gemini and how many vision calls may run at once
+GEMINI_RPM = int(_clean_env("GEMINI_RPM", "30"))
+VISION_MAX_WORKERS = int(_clean_env("GEMINI_VISION_WORKERS", "4"))
+# Designers analyzed at the same time by analyze_all_designers
+DESIGNER_MAX_WORKERS = int(_clean_env("GEMINI_DESIGNER_WORKERS", "3"))
+# Images sent together in one multimodal request (1 = one request per image)
+VISION_BATCH_SIZE = max(1, min(8, int(_clean_env("GEMINI_VISION_BATCH_SIZE", "4"))))
+# Process-wide cap on in-flight vision requests across all designers and batches
+VISION_MAX_CONCURRENCY = int(_clean_env("GEMINI_VISION_CONCURRENCY", "8"))
+# Send final assessments through the Gemini Batch API (half price, minutes of latency)
+USE_BATCH_API = _clean_env("TALENTLENS_USE_BATCH") == "1"
+BATCH_POLL_SECONDS = 15
+BATCH_TIMEOUT_SECONDS = int(_clean_env("TALENTLENS_BATCH_TIMEOUT", "3600"))
+
+
+class _RateLimiter:
+    """
+    Shared broker for Gemini requests: tracks request starts over a rolling
+    60-second window and only waits when the window is at the ceiling.
+
+    The ceiling adapts (AIMD): a congestion event halves it once and pauses
+    every caller for the server's retry hint, and each success recovers it by
+    half a request per minute back up to the configured RPM. 429s that land
+    within the current pause or window of the last cut belong to the same
+    event, so a burst of concurrent rejections doesn't collapse the ceiling.
+    """
+
+    def __init__(self, rpm: int, window: float = 60.0):
+        self.rpm = max(rpm, 1)
+        self.window = window
+        self._limit = float(self.rpm)
+        self._paused_until = 0.0
+        self._last_cut = float("-inf")
+        self._events = deque()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Block until a request may start, then record it."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                if now < self._paused_until:
+                    wait = self._paused_until - now
+                else:
+                    while self._events and now - self._events[0] >= self.window:
+                        self._events.popleft()
+                    if len(self._events) < int(self._limit):
+                        self._events.append(now)
+                        return
+                    wait = self.window - (now - self._events[0])
+            time.sleep(wait)
+
+    def throttled(self, retry_after: Optional[float] = None):
+        """Record a 429: halve the ceiling once per congestion event and hold all callers for the retry hint."""
+        with self._lock:
+            now = time.monotonic()
+            if now >= self._paused_until and now - self._last_cut >= self.window:
+                self._limit = max(1.0, self._limit / 2)
+                self._last_cut = now
+            if retry_after:
+                self._paused_until = max(self._paused_until, now + retry_after)
+            limit = int(self._limit)
+        print(f"    [Analyzer] Gemini rate limited — ceiling now {limit} RPM")
+
+    def succeeded(self):
+        """Record a successful request: additively recover toward the configured RPM."""
+        with self._lock:
+            self._limit = min(float(self.rpm), self._limit + 0.5)
+
+
+rate_limiter = _RateLimiter(GEMINI_RPM)
+vision_slots = threading.BoundedSemaphore(max(VISION_MAX_CONCURRENCY, 1))
+
+# Vision analyses are deterministic enough per (image, prompt) to reuse across runs
+VISION_CACHE_TTL = 30 * 86400
+vision_cache = DiskCache(os.path.join(CACHE_DIR, "vision.sqlite3"))
+_VISION_CACHE_VERSION = "scores-v1"  # bump when the cached analysis shape changes
+
+# Final assessments keyed by their full input, so unchanged designers aren't re-assessed
+ASSESSMENT_CACHE_TTL = 7 * 86400
+assessment_cache = DiskCache(os.path.join(CACHE_DIR, "assessments.sqlite3"))
+
+
+def _vision_cache_key(image: bytes, work_title: str, skills_text: str, focus_area: str) -> str:
+    """Content-addressed key: the uploaded bytes plus every input that shapes the prompt."""
+    h = hashlib.blake2b(image, digest_size=16)
+    h.update(f"\0{_VISION_CACHE_VERSION}\0{GEMINI_VISION_MODEL}\0{work_title}\0{skills_text}\0{focus_area}".encode())
+    return h.hexdigest()
 
-def _gemini_text(system: str, user: str, max_tokens: int = 3000, retries: int = 3, json_mode: bool = False, model: str = None) -> str:
-    """Call Gemini with retries and exponential back-off."""
+
+def _retry_after_seconds(error: Exception) -> Optional[float]:
+    """Extract a server-provided retry hint from a Gemini API error, if any."""
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    try:
+        if headers.get("retry-after"):
+            return float(headers["retry-after"])
+    except (TypeError, ValueError):
+        pass
+
+    # Gemini reports quota resets as a google.rpc.RetryInfo detail, e.g. {"retryDelay": "12s"}
+    details = getattr(error, "details", None)
+    if isinstance(details, dict):
+        for item in details.get("error", {}).get("details", []) or []:
+            delay = item.get("retryDelay") if isinstance(item, dict) else None
+            if isinstance(delay, str) and delay.endswith("s"):
+                try:
+                    return float(delay[:-1])
+                except ValueError:
+                    pass
+    return None
+
+
+def _is_retryable(error: Exception) -> bool:
+    """4xx errors other than timeouts and rate limits (bad request, auth, not found) won't succeed on retry."""
+    return not (isinstance(error, genai_errors.ClientError) and error.code not in (408, 429))
+
+
+def _note_api_error(error: Exception):
+    """Feed a 429 back into the shared limiter so every worker slows down, not just this one."""
+    if getattr(error, "code", None) == 429:
+        rate_limiter.throttled(_retry_after_seconds(error))
+
+
+def _backoff_delay(attempt: int, error: Optional[Exception] = None,
+                   base: float = 1.0, cap: float = 30.0) -> float:
+    """Full-jitter exponential back-off, floored by the retry hint on a 429."""
+    delay = random.uniform(0, min(cap, base * 2 ** attempt))
+    if error is not None and getattr(error, "code", None) == 429:
+        hint = _retry_after_seconds(error)
+        if hint:
+            delay = max(delay, hint)
+    return delay
+
+
+def _text_config(system: str, max_tokens: int, json_mode: bool) -> types.GenerateContentConfig:
+    config_args = dict(
+        system_instruction=system,
+        max_output_tokens=max_tokens,
+        temperature=0.2,
+    )
+    if json_mode:
+        config_args["response_mime_type"] = "application/json"
+    return types.GenerateContentConfig(**config_args)
+
+
+def _gemini_text_stream(system: str, user: str, max_tokens: int = 3000, retries: int = 3, json_mode: bool = False, model: str = None, required_keys: Tuple[str, ...] = ()) -> str:
+    """
+    Call Gemini with streaming, jittered exponential back-off, retrying only transient failures.
+
+    Chunks are collected in a list and joined only when needed. In JSON mode a
+    parse is attempted only when a chunk ends on a closing brace or bracket, so
+    the stream is closed as soon as the document is complete without
+    re-parsing the growing buffer on every chunk. A complete document that
+    lacks any of `required_keys` counts as a failed attempt and is retried.
+    A stream that ends without a complete document is returned as-is for
+    _parse_json_from_text to repair.
+    """
     use_model = model or GEMINI_ASSESSMENT_MODEL
     for attempt in range(retries):
+        error = None
+        stream = None
         try:
-            config_args = dict(
-                system_instruction=system,
-                max_output_tokens=max_tokens,
-                temperature=0.2,
-            )
-            if json_mode:
-                config_args["response_mime_type"] = "application/json"
-            response = gemini_client.models.generate_content(
+            chunks: List[str] = []
+            rate_limiter.acquire()
+            stream = get_gemini_client().models.generate_content_stream(
                 model=use_model,
                 contents=user,
-                config=types.GenerateContentConfig(**config_args),
+                config=_text_config(system, max_tokens, json_mode),
             )
-            text = response.text or ""
-            if text:
+            parsed = None
+            for chunk in stream:
+                piece = chunk.text or ""
+                if not piece:
+                    continue
+                chunks.append(piece)
+                if json_mode and piece.rstrip()[-1:] in ("}", "]"):
+                    try:
+                        parsed = orjson.loads("".join(chunks))
+                        break
+                    except orjson.JSONDecodeError:
+                        pass
+            rate_limiter.succeeded()
+            text = "".join(chunks)
+            missing = [k for k in required_keys if not isinstance(parsed, dict) or k not in parsed]
+            if parsed is not None and missing:
+                print(f"    [Analyzer] Response missing {', '.join(missing)} (attempt {attempt + 1}/{retries})")
+            elif text:
                 return text
-            print(f"    [Analyzer] Empty Gemini response (attempt {attempt + 1}/{retries})")
+            else:
+                print(f"    [Analyzer] Empty Gemini stream (attempt {attempt + 1}/{retries})")
         except Exception as e:
+            error = e
+            _note_api_error(e)
             print(f"    [Analyzer] Gemini API error (attempt {attempt + 1}/{retries}): {e}")
+            if not _is_retryable(e):
+                print("    [Analyzer] Not retryable — giving up")
+                return ""
+        finally:
+            # Stop the server generating tokens nobody will read
+            close = getattr(stream, "close", None)
+            if close:
+                close()
         if attempt < retries - 1:
-            wait = 3 * (attempt + 1)
-            print(f"    [Analyzer] Retrying in {wait}s...")
+            wait = _backoff_delay(attempt, error)
+            print(f"    [Analyzer] Retrying in {wait:.1f}s...")
             time.sleep(wait)
     return ""
 
 
+_FENCE_RE = re.compile(r'```(?:json)?\n?')
+_TRAILING_FENCE_RE = re.compile(r'```\s*$')
+_TRAILING_COMMA_RE = re.compile(r',\s*$')
+
+
 def _parse_json_from_text(text: str):
     """
     Robust JSON parser that handles:
@@ -73,36 +296,32 @@ def _parse_json_from_text(text: str):
 
     # Strategy 1: Direct parse (works when response_mime_type is set)
     try:
-        return json.loads(text.strip())
-    except json.JSONDecodeError:
+        return orjson.loads(text.strip())
+    except orjson.JSONDecodeError:
         pass
 
     # Strategy 2: Extract from markdown code block (```json ... ```)
-    for marker in ("```json", "```"):
-        if marker in text:
-            s = text.find(marker) + len(marker)
-            # Skip optional newline after marker
-            if s < len(text) and text[s] == '\n':
-                s += 1
-            e = text.find("```", s)
-            # If closing ``` is missing (truncated), take everything after marker
-            block = text[s:e].strip() if e != -1 else text[s:].strip()
-            try:
-                return json.loads(block)
-            except json.JSONDecodeError:
-                repaired = _repair_json(block)
-                if repaired is not None:
-                    return repaired
+    fence = _FENCE_RE.search(text)
+    if fence:
+        s = fence.end()
+        e = text.find("```", s)
+        # If closing ``` is missing (truncated), take everything after marker
+        block = text[s:e].strip() if e != -1 else text[s:].strip()
+        try:
+            return orjson.loads(block)
+        except orjson.JSONDecodeError:
+            repaired = _repair_json(block)
+            if repaired is not None:
+                return repaired
 
     # Strategy 3: Find first { and try to parse from there
-    m = re.search(r'\{', text)
-    if m:
-        candidate = text[m.start():]
+    start = text.find("{")
+    if start != -1:
         # Remove any trailing ``` that might be after the JSON
-        candidate = re.sub(r'```\s*$', '', candidate).strip()
+        candidate = _TRAILING_FENCE_RE.sub("", text[start:]).strip()
         try:
-            return json.loads(candidate)
-        except json.JSONDecodeError:
+            return orjson.loads(candidate)
+        except orjson.JSONDecodeError:
             repaired = _repair_json(candidate)
             if repaired is not None:
                 return repaired
@@ -110,231 +329,399 @@ def _parse_json_from_text(text: str):
     return None
 
 
+_JSON_DECODER = json.JSONDecoder()
+
+
 def _repair_json(text: str):
-    """Try to repair truncated JSON by closing open braces/brackets."""
+    """
+    Recover a JSON object from model output that is followed by junk or cut off.
+
+    A complete object with trailing garbage is taken with raw_decode. For a
+    truncated one, a single pass tracks open containers (ignoring brackets
+    inside strings) and the last comma outside a string, then closes the
+    document either as-is or at that comma, dropping a half-written member.
+    """
     text = text.strip()
     if not text.startswith('{'):
         return None
 
-    # Remove trailing commas
-    text = re.sub(r',\s*$', '', text)
+    try:
+        return _JSON_DECODER.raw_decode(text)[0]
+    except json.JSONDecodeError:
+        pass
+
+    closers = []
+    last_comma = None  # (index, closers open at that point)
+    in_string = escaped = False
+    for i, c in enumerate(text):
+        if in_string:
+            if escaped:
+                escaped = False
+            elif c == '\\':
+                escaped = True
+            elif c == '"':
+                in_string = False
+        elif c == '"':
+            in_string = True
+        elif c == '{':
+            closers.append('}')
+        elif c == '[':
+            closers.append(']')
+        elif c in '}]':
+            if closers:
+                closers.pop()
+        elif c == ',':
+            last_comma = (i, closers[:])
 
-    # Count open vs close braces/brackets
-    open_braces = text.count('{') - text.count('}')
-    open_brackets = text.count('[') - text.count(']')
+    candidates = []
+    tail = text + '"' if in_string else text
+    candidates.append(_TRAILING_COMMA_RE.sub('', tail.rstrip()) + ''.join(reversed(closers)))
+    if last_comma:
+        i, open_at_comma = last_comma
+        candidates.append(text[:i] + ''.join(reversed(open_at_comma)))
 
-    # If balanced, try parsing directly
-    if open_braces == 0 and open_brackets == 0:
+    for candidate in candidates:
         try:
-            return json.loads(text)
-        except json.JSONDecodeError:
+            return orjson.loads(candidate)
+        except orjson.JSONDecodeError:
             pass
+    return None
 
-    # Try to close truncated JSON
-    repaired = text.rstrip()
 
-    # Fix unbalanced quotes (truncated string)
-    if repaired.count('"') % 2 != 0:
-        last_quote = repaired.rfind('"')
-        repaired = repaired[:last_quote + 1]
+# Large or oversized uploads are downscaled and re-encoded; the model gains
+# nothing from multi-MB or 2000px+ originals but they cost upload time and
+# image tokens (Gemini tiles big images into several 768px tiles)
+_RECOMPRESS_MIN_BYTES = 400 * 1024
+_MAX_IMAGE_EDGE = 1024
 
-    # Remove trailing comma
-    repaired = re.sub(r',\s*$', '', repaired)
 
-    # Close brackets then braces
-    repaired += ']' * max(0, open_brackets)
-    repaired += '}' * max(0, open_braces)
+def _long_edge(source) -> int:
+    """Longest side of an image in pixels, read from its header only (0 if unreadable)."""
+    try:
+        with Image.open(source) as img:
+            return max(img.size)
+    except Exception:
+        return 0
+
 
+def _downscale_to_jpeg(source, filepath: str) -> Optional[bytes]:
+    """Decode `source` (any file-like object), shrink it to _MAX_IMAGE_EDGE and re-encode as JPEG."""
     try:
-        return json.loads(repaired)
-    except json.JSONDecodeError:
-        pass
+        with Image.open(source) as img:
+            # JPEGs can be DCT-scaled by 1/2..1/8 while decoding, far cheaper than a full decode
+            img.draft("RGB", (_MAX_IMAGE_EDGE, _MAX_IMAGE_EDGE))
+            img.thumbnail((_MAX_IMAGE_EDGE, _MAX_IMAGE_EDGE), Image.LANCZOS)
+            if img.mode in ("RGBA", "LA", "P"):
+                rgba = img.convert("RGBA")
+                flat = Image.new("RGB", rgba.size, (255, 255, 255))
+                flat.paste(rgba, mask=rgba.getchannel("A"))
+            else:
+                flat = img.convert("RGB")
+            buf = io.BytesIO()
+            flat.save(buf, format="JPEG", quality=85, optimize=True)
+    except Exception as e:
+        print(f"    [Analyzer] Could not recompress {filepath}: {e}")
+        return None
+    return buf.getvalue()
 
-    return None
 
+def _prepare_image_bytes(filepath: str) -> Optional[Tuple[bytes, str]]:
+    """
+    Load an image for upload, shrinking it to a ~1024px JPEG when it is
+    large on disk or wider than _MAX_IMAGE_EDGE. Returns (bytes, mime).
 
-def _load_image_as_base64(filepath: str) -> Optional[str]:
-    """Load a local image file and return its base64 encoding."""
+    The size comes from fstat on the open descriptor, so placeholders are
+    rejected without reading them and small files are read in one call.
+    Large files are memory-mapped so Pillow decodes straight from the page
+    cache; a copy of the original is only made when it is sent as-is.
+    """
+    mime = _detect_mime_type(filepath)
     try:
-        if not os.path.exists(filepath):
-            return None
         with open(filepath, "rb") as f:
-            data = f.read()
-        if len(data) < 1000:
-            return None
-        return base64.b64encode(data).decode("utf-8")
-    except Exception:
+            size = os.fstat(f.fileno()).st_size
+            if size < 1000:
+                return None
+            if size <= _RECOMPRESS_MIN_BYTES:
+                raw = f.read()
+                if _long_edge(io.BytesIO(raw)) <= _MAX_IMAGE_EDGE:
+                    return raw, mime
+                # Oversized dimensions: fewer pixels means fewer image tokens even if bytes don't shrink
+                data = _downscale_to_jpeg(io.BytesIO(raw), filepath)
+                return (data, "image/jpeg") if data else (raw, mime)
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                data = _downscale_to_jpeg(mm, filepath)
+                if not data or len(data) >= size:
+                    return mm[:], mime
+                return data, "image/jpeg"
+    except OSError:
         return None
 
 
+_MIME_MAP = {
+    "jpg": "image/jpeg",
+    "jpeg": "image/jpeg",
+    "png": "image/png",
+    "gif": "image/gif",
+    "webp": "image/webp",
+}
+
+
 def _detect_mime_type(filepath: str) -> str:
-    ext = os.path.splitext(filepath)[1].lower()
-    mime_map = {
-        ".jpg": "image/jpeg",
-        ".jpeg": "image/jpeg",
-        ".png": "image/png",
-        ".gif": "image/gif",
-        ".webp": "image/webp",
-    }
-    return mime_map.get(ext, "image/jpeg")
+    return _MIME_MAP.get(filepath.rpartition(".")[2].lower(), "image/jpeg")
 
 
-def analyze_image(filepath: str, work_title: str, skills: List[str], focus_area: str) -> Optional[str]:
+_IMAGE_SCORE_KEYS = ("aesthetics", "creativity", "technical")
+_IMAGE_JSON_SHAPE = (
+    '{"aesthetics": <float 1.0-5.0>, "creativity": <float 1.0-5.0>, '
+    '"technical": <float 1.0-5.0>, "notes": "1-2 sentences"}'
+)
+
+
+# Shared evaluation criteria for the vision prompts; filled in with str.format_map
+_IMAGE_CRITERIA = (
+    "1) Overall visual design quality and aesthetics (most important), "
+    "2) Creativity and originality of the design, "
+    "3) Technical execution and polish, "
+    "4) Whether this level of design talent could produce great work in the '{focus_area}' domain. "
+    "IMPORTANT: Do NOT penalize the designer for not having prior experience in '{focus_area}'. "
+    "Great designers can transfer their skills across domains. "
+    "Judge the QUALITY of design work shown, not whether it matches the search domain exactly. "
+)
+
+_IMAGE_PROMPT = (
+    "Evaluate this design project titled '{work_title}' "
+    "by a designer with skills in: {skills_text}. "
+    "The user searched for '{focus_area}'. "
+    "Focus your analysis on: "
+    + _IMAGE_CRITERIA +
+    "Return ONLY a JSON object: {json_shape}"
+)
+
+_IMAGE_BATCH_PROMPT = (
+    "Evaluate each of the following design projects by a designer with skills in: {skills_text}. "
+    "The user searched for '{focus_area}'. "
+    "For EACH image, focus your analysis on: "
+    + _IMAGE_CRITERIA +
+    'Return ONLY a JSON object: {{"analyses": [<one entry per image>]}} where each entry is {json_shape}'
+)
+
+
+def _coerce_image_analysis(obj) -> Optional[Dict]:
+    """Normalize a model-emitted image analysis to the per-image score shape."""
+    if not isinstance(obj, dict):
+        return None
+    analysis = {}
+    for key in _IMAGE_SCORE_KEYS:
+        try:
+            analysis[key] = max(1.0, min(5.0, float(obj.get(key))))
+        except (TypeError, ValueError):
+            return None
+    analysis["notes"] = str(obj.get("notes") or "")[:400]
+    return analysis
+
+
+def _cached_image_analysis(cache_key: str) -> Optional[Dict]:
+    cached = vision_cache.get(cache_key)
+    if not cached:
+        return None
+    try:
+        return _coerce_image_analysis(orjson.loads(cached))
+    except orjson.JSONDecodeError:
+        return None
+
+
+def analyze_image(filepath: str, work_title: str, skills: List[str], focus_area: str) -> Optional[Dict]:
     """
     Analyze a single design image using Gemini Flash vision.
-    Returns text analysis of the design.
+    Returns 1-5 scores for aesthetics, creativity and technical execution plus short notes.
     """
-    b64 = _load_image_as_base64(filepath)
-    if not b64:
+    prepared = _prepare_image_bytes(filepath)
+    if not prepared:
         print(f"    [Analyzer] Could not load image: {filepath}")
         return None
 
-    mime = _detect_mime_type(filepath)
+    raw, mime = prepared
     skills_text = ", ".join(skills) if skills else "general design"
+    cache_key = _vision_cache_key(raw, work_title, skills_text, focus_area)
+    cached = _cached_image_analysis(cache_key)
+    if cached:
+        print(f"    [Analyzer] Using cached analysis for '{work_title}'")
+        return cached
 
     try:
-        response = gemini_client.models.generate_content(
-            model=GEMINI_VISION_MODEL,
-            contents=[
-                types.Content(
-                    role="user",
-                    parts=[
-                        types.Part.from_text(text=
-                            f"Evaluate this design project titled '{work_title}' "
-                            f"by a designer with skills in: {skills_text}. "
-                            f"The user searched for '{focus_area}'. "
-                            f"Focus your analysis on: "
-                            f"1) Overall visual design quality and aesthetics (most important), "
-                            f"2) Creativity and originality of the design, "
-                            f"3) Technical execution and polish, "
-                            f"4) Whether this level of design talent could produce great work in the '{focus_area}' domain. "
-                            f"IMPORTANT: Do NOT penalize the designer for not having prior experience in '{focus_area}'. "
-                            f"Great designers can transfer their skills across domains. "
-                            f"Judge the QUALITY of design work shown, not whether it matches the search domain exactly."
-                        ),
-                        types.Part.from_bytes(
-                            data=base64.b64decode(b64),
-                            mime_type=mime,
-                        ),
-                    ],
-                )
-            ],
-            config=types.GenerateContentConfig(
-                max_output_tokens=600,
-                temperature=0.2,
-            ),
-        )
-        return response.text or None
+        with vision_slots:
+            rate_limiter.acquire()
+            response = get_gemini_client().models.generate_content(
+                model=GEMINI_VISION_MODEL,
+                contents=[
+                    types.Content(
+                        role="user",
+                        parts=[
+                            types.Part.from_text(text=_IMAGE_PROMPT.format_map({
+                                "work_title": work_title,
+                                "skills_text": skills_text,
+                                "focus_area": focus_area,
+                                "json_shape": _IMAGE_JSON_SHAPE,
+                            })),
+                            types.Part.from_bytes(
+                                data=raw,
+                                mime_type=mime,
+                            ),
+                        ],
+                    )
+                ],
+                config=types.GenerateContentConfig(
+                    max_output_tokens=600,
+                    temperature=0.2,
+                    response_mime_type="application/json",
+                ),
+            )
+        rate_limiter.succeeded()
+        analysis = _coerce_image_analysis(_parse_json_from_text(response.text or ""))
+        if analysis:
+            vision_cache.set(cache_key, orjson.dumps(analysis).decode(), expire=VISION_CACHE_TTL)
+        return analysis
     except Exception as e:
+        _note_api_error(e)
         print(f"    [Analyzer] Vision error: {e}")
         return None
 
 
-def analyze_designer(designer: Dict, focus_area: str) -> Dict:
+def analyze_images(shots: List[Dict], skills: List[str], focus_area: str) -> List[Optional[Dict]]:
     """
-    Produce a full talent analysis for a single designer using Gemini.
-    Analyzes their downloaded images, then produces scores and recommendation.
+    Analyze several design images in a single multimodal Gemini request.
+    Returns one score dict per shot, in order (None where an image could
+    not be loaded or the model skipped it).
     """
-    username = designer.get("username", "unknown")
-    name = designer.get("name", username)
-    print(f"  [Analyzer] Analyzing {username}...")
-
-    # ── Analyze each downloaded image ─────────────────────────────────────────
-    image_analyses = []
-    shots = designer.get("shots", [])
-    skills = designer.get("skills", [])
+    results: List[Optional[Dict]] = [None] * len(shots)
+    skills_text = ", ".join(skills) if skills else "general design"
 
+    parts = [types.Part.from_text(text=_IMAGE_BATCH_PROMPT.format_map({
+        "skills_text": skills_text,
+        "focus_area": focus_area,
+        "json_shape": _IMAGE_JSON_SHAPE[:-1] + ', "image": <image number>}',
+    }))]
+    attached = []  # indexes into shots, in the order they were attached
+    cache_keys = {}
     for i, shot in enumerate(shots):
-        abs_path = shot.get("absolute_path", "")
-        if not abs_path or not os.path.exists(abs_path):
+        filepath = shot["absolute_path"]
+        prepared = _prepare_image_bytes(filepath)
+        if not prepared:
+            print(f"    [Analyzer] Could not load image: {filepath}")
+            continue
+        raw, mime = prepared
+        title = shot.get("title", "Untitled")
+        cache_keys[i] = _vision_cache_key(raw, title, skills_text, focus_area)
+        cached = _cached_image_analysis(cache_keys[i])
+        if cached:
+            print(f"    [Analyzer] Using cached analysis for '{title}'")
+            results[i] = cached
             continue
+        attached.append(i)
+        parts.append(types.Part.from_text(text=f"Image {len(attached)}: '{title}'"))
+        parts.append(types.Part.from_bytes(data=raw, mime_type=mime))
 
-        print(f"    [Analyzer] Analyzing image {i + 1}/{len(shots)}: {shot.get('title', '?')}")
-        analysis = analyze_image(abs_path, shot.get("title", "Untitled"), skills, focus_area)
-        if analysis:
-            image_analyses.append({
-                "title": shot.get("title", ""),
-                "analysis": analysis,
-            })
-        time.sleep(2)
+    if not attached:
+        return results
 
-    # ── Generate overall assessment ───────────────────────────────────────────
-    skills_text = ", ".join(skills) if skills else "general design"
-    followers = designer.get("metrics", {}).get("followers_count", "unknown")
-    location = designer.get("location", "unknown")
-    bio = designer.get("bio", "")
-
-    portfolio_context = {
-        "name": name,
-        "username": username,
-        "location": location,
-        "bio": bio,
-        "skills": skills,
-        "followers": followers,
-        "images_analyzed": len(image_analyses),
-        "image_analyses": image_analyses,
-    }
+    try:
+        with vision_slots:
+            rate_limiter.acquire()
+            response = get_gemini_client().models.generate_content(
+                model=GEMINI_VISION_MODEL,
+                contents=[types.Content(role="user", parts=parts)],
+                config=types.GenerateContentConfig(
+                    max_output_tokens=600 * len(attached),
+                    temperature=0.2,
+                    response_mime_type="application/json",
+                ),
+            )
+        rate_limiter.succeeded()
+        parsed = _parse_json_from_text(response.text or "")
+        entries = parsed.get("analyses", []) if isinstance(parsed, dict) else []
+        for entry in entries:
+            if not isinstance(entry, dict):
+                continue
+            n, analysis = entry.get("image"), _coerce_image_analysis(entry)
+            if isinstance(n, int) and 1 <= n <= len(attached) and analysis:
+                i = attached[n - 1]
+                results[i] = analysis
+                vision_cache.set(cache_keys[i], orjson.dumps(analysis).decode(), expire=VISION_CACHE_TTL)
+    except Exception as e:
+        _note_api_error(e)
+        print(f"    [Analyzer] Vision error: {e}")
+    return results
 
-    system = (
-        f"You are a brutally honest, elite-level design critic evaluating UI/UX designers' portfolios. "
-        f"The user searched for '{focus_area}' — this is a KEYWORD describing the UI/UX design DOMAIN they need. "
-        f"For example, if the keyword is 'car', the user wants UI/UX designers who create CAR-related digital experiences "
-        f"(car rental apps, automotive dashboards, vehicle configurators, car dealership websites, EV charging UIs, etc). "
-        f"The keyword '{focus_area}' is NOT about the designer's job title — ALL candidates are UI/UX designers. "
-        f"It IS about whether their portfolio shows relevant work in the '{focus_area}' domain.\n\n"
-        "You have image-by-image analyses of their actual design work. "
-        "Produce a comprehensive evaluation as a JSON object.\n\n"
-        "STRICT SCORING RULES — YOU MUST FOLLOW THESE:\n"
-        "1. Be CRITICAL but FAIR. A score of 3.0/5.0 means 'average'. Give credit where deserved.\n"
-        "2. Reserve 4.5+ ratings for truly world-class, award-winning caliber work.\n"
-        "3. Score 4.0-4.4 means 'very good with clear strengths'.\n"
-        "4. Score 3.0-3.9 means 'competent, professional'.\n"
-        "5. Score below 3.0 means 'below expectations for a professional'.\n"
-        "6. overall_score mapping: 71+ = strong/HIRE, 41-70 = decent/CONSIDER, 40 or below = weak/REJECT.\n"
-        "7. Follower counts are a positive signal but not the only factor.\n"
-        "8. Evaluate design excellence from the actual images analyzed.\n"
-        "9. Generic, template-looking designs should score 3.0-3.5.\n"
-        "10. Only give HIRE recommendation if overall_score >= 71.\n"
-        "11. REJECT if overall_score <= 40 or if design quality is genuinely poor.\n"
-        "12. CONSIDER for everything in between (41-70).\n"
-        f"13. 'specialization_alignment' measures how well their UI/UX work aligns with '{focus_area}' — "
-        f"a designer who has done car rental app UIs scores high for 'car', even if they also do other domains.\n"
-        "14. KEEP ALL reasoning and feedback strings VERY SHORT — 1-2 sentences max per field. Be concise.\n"
-    )
 
-    user_prompt = f"""Evaluate this UI/UX designer's portfolio and return ONLY a valid JSON object.
-The user is looking for UI/UX designers in the '{focus_area}' domain. Be STRICT — most designers should score 55-75.
+def _summarize_image_analyses(image_analyses: List[Dict]) -> Dict:
+    """Collapse per-image scores into mean/max per dimension plus the notes of the top 3 shots."""
+    summary = {}
+    for key in _IMAGE_SCORE_KEYS:
+        values = [a[key] for a in image_analyses]
+        summary[key] = {"mean": round(sum(values) / len(values), 2), "max": max(values)}
+    ranked = sorted(image_analyses, key=lambda a: sum(a[k] for k in _IMAGE_SCORE_KEYS), reverse=True)
+    summary["top_notes"] = [{"title": a["title"], "notes": a["notes"]} for a in ranked[:3] if a["notes"]]
+    return summary
 
-REMEMBER: '{focus_area}' is the DOMAIN keyword. All candidates are UI/UX designers.
-Judge: (1) quality of their UI/UX design work, (2) relevance to the '{focus_area}' domain.
 
-{{
+# System instructions for the final assessment. Kept free of per-run values
+# (the search keyword goes in the user message) so the prompt prefix is identical across requests.
+_ASSESSMENT_SYSTEM_PROMPT = (
+    "You are a brutally honest, elite-level design critic evaluating UI/UX designers' portfolios. "
+    "The user searched for a KEYWORD (given with each request) describing the UI/UX design DOMAIN they need. "
+    "For example, if the keyword is 'car', the user wants UI/UX designers who create CAR-related digital experiences "
+    "(car rental apps, automotive dashboards, vehicle configurators, car dealership websites, EV charging UIs, etc). "
+    "The keyword is NOT about the designer's job title — ALL candidates are UI/UX designers. "
+    "It IS about whether their portfolio shows relevant work in the keyword's domain.\n\n"
+    "You have 1-5 scores (mean and max across images) for aesthetics, creativity and technical execution "
+    "of their actual design work, plus reviewer notes on their strongest shots. "
+    "Produce a comprehensive evaluation as a JSON object.\n\n"
+    "STRICT SCORING RULES — YOU MUST FOLLOW THESE:\n"
+    "1. Be CRITICAL but FAIR. A score of 3.0/5.0 means 'average'. Give credit where deserved.\n"
+    "2. Reserve 4.5+ ratings for truly world-class, award-winning caliber work.\n"
+    "3. Score 4.0-4.4 means 'very good with clear strengths'.\n"
+    "4. Score 3.0-3.9 means 'competent, professional'.\n"
+    "5. Score below 3.0 means 'below expectations for a professional'.\n"
+    "6. overall_score mapping: 71+ = strong/HIRE, 41-70 = decent/CONSIDER, 40 or below = weak/REJECT.\n"
+    "7. Follower counts are a positive signal but not the only factor.\n"
+    "8. Evaluate design excellence from the actual images analyzed.\n"
+    "9. Generic, template-looking designs should score 3.0-3.5.\n"
+    "10. Only give HIRE recommendation if overall_score >= 71.\n"
+    "11. REJECT if overall_score <= 40 or if design quality is genuinely poor.\n"
+    "12. CONSIDER for everything in between (41-70).\n"
+    "13. 'specialization_alignment' measures how well their UI/UX work aligns with the keyword — "
+    "a designer who has done car rental app UIs scores high for 'car', even if they also do other domains.\n"
+    "14. KEEP ALL reasoning and feedback strings VERY SHORT — 1-2 sentences max per field. Be concise.\n"
+)
+
+# Response schema and scoring guidelines shared by every assessment request
+_ASSESSMENT_SCHEMA = """{
   "overall_rating": <float 1.0-5.0>,
   "overall_score": <int 20-100>,
-  "metrics": {{
-    "design_excellence": {{ "rating": <float>, "reasoning": "1-2 sentences" }},
-    "ux_mastery": {{ "rating": <float>, "reasoning": "1-2 sentences" }},
-    "industry_expertise": {{ "rating": <float>, "reasoning": "1-2 sentences" }},
-    "technical_sophistication": {{ "rating": <float>, "reasoning": "1-2 sentences" }},
-    "innovation_creativity": {{ "rating": <float>, "reasoning": "1-2 sentences" }},
-    "specialization_alignment": {{ "rating": <float>, "reasoning": "1-2 sentences" }},
-    "market_positioning": {{ "rating": <float>, "reasoning": "1-2 sentences" }}
-  }},
+  "metrics": {
+    "design_excellence": { "rating": <float>, "reasoning": "1-2 sentences" },
+    "ux_mastery": { "rating": <float>, "reasoning": "1-2 sentences" },
+    "industry_expertise": { "rating": <float>, "reasoning": "1-2 sentences" },
+    "technical_sophistication": { "rating": <float>, "reasoning": "1-2 sentences" },
+    "innovation_creativity": { "rating": <float>, "reasoning": "1-2 sentences" },
+    "specialization_alignment": { "rating": <float>, "reasoning": "1-2 sentences" },
+    "market_positioning": { "rating": <float>, "reasoning": "1-2 sentences" }
+  },
   "strengths": ["short", "short", "short"],
   "areas_for_improvement": ["short", "short"],
-  "recommendation": {{
+  "recommendation": {
     "decision": "HIRE|CONSIDER|REJECT",
     "confidence": "HIGH|MEDIUM|LOW",
     "reasoning": "1-2 sentences",
     "suitable_roles": ["Role"]
-  }},
-  "detailed_feedback": {{
+  },
+  "detailed_feedback": {
     "what_stands_out": "1 sentence",
     "biggest_concerns": "1 sentence",
     "growth_potential": "1 sentence",
     "industry_fit": "1 sentence"
-  }}
-}}
+  }
+}
 
 SCORING GUIDELINES:
 - Average professional UI/UX designer = overall_score 60-70
@@ -345,58 +732,408 @@ SCORING GUIDELINES:
 - Only REJECT (score <=40) if the work is genuinely poor.
 
 THRESHOLDS: HIRE >= 71, CONSIDER 41-70, REJECT <= 40
+"""
+
+# Per-designer user message; everything before DESIGNER DATA is identical for a
+# whole run, so provider-side prompt caching can reuse it across designers
+_ASSESSMENT_USER_PROMPT = """Evaluate this UI/UX designer's portfolio and return ONLY a valid JSON object.
+The user is looking for UI/UX designers in the '{focus_area}' domain. Be STRICT — most designers should score 55-75.
+
+REMEMBER: '{focus_area}' is the DOMAIN keyword. All candidates are UI/UX designers.
+Judge: (1) quality of their UI/UX design work, (2) relevance to the '{focus_area}' domain.
+
+{schema}DESIGNER DATA:
+{designer_data}"""
+
+# Top-level fields an assessment must contain to be accepted (overall_score is derived if absent)
+_ASSESSMENT_REQUIRED_KEYS = ("overall_rating", "metrics", "recommendation")
+
+_FALLBACK_METRIC = {"rating": 2.5, "reasoning": "Analysis failed"}
+
+# Returned (as a deep copy) whenever the final assessment can't be produced
+_FALLBACK_ANALYSIS = {
+    "overall_rating": 2.5,
+    "overall_score": 50,
+    "metrics": {
+        name: dict(_FALLBACK_METRIC)
+        for name in (
+            "design_excellence",
+            "ux_mastery",
+            "industry_expertise",
+            "technical_sophistication",
+            "innovation_creativity",
+            "specialization_alignment",
+            "market_positioning",
+        )
+    },
+    "strengths": ["Manual review required"],
+    "areas_for_improvement": ["Analysis failed"],
+    "recommendation": {
+        "decision": "CONSIDER",
+        "confidence": "LOW",
+        "reasoning": "Automated analysis failed — manual review needed",
+        "suitable_roles": ["Unknown"],
+    },
+    "detailed_feedback": {
+        "what_stands_out": "Analysis failed",
+        "biggest_concerns": "System error",
+        "growth_potential": "Unknown",
+        "industry_fit": "Unknown",
+    },
+}
 
-DESIGNER DATA:
-{json.dumps(portfolio_context, indent=2, default=str)}"""
 
+@dataclass(slots=True)
+class PortfolioContext:
+    """Designer data embedded in the assessment prompt (orjson serializes dataclasses natively)."""
+    name: str
+    username: str
+    location: str
+    bio: str
+    skills: List[str]
+    followers: Any
+    images_analyzed: int
+    image_scores: Dict
+
+
+def _file_digest(filepath: str) -> Optional[str]:
+    """BLAKE2b of a file's contents, read in 1 MB blocks (None if unreadable)."""
+    h = hashlib.blake2b(digest_size=16)
     try:
-        print(f"  [Analyzer] Generating final assessment for {username}...")
-        result_text = _gemini_text(system, user_prompt, max_tokens=8192, retries=3, json_mode=True)
+        with open(filepath, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                h.update(block)
+    except OSError:
+        return None
+    return h.hexdigest()
+
+
+def _build_portfolio_context(designer: Dict, focus_area: str) -> PortfolioContext:
+    """Analyze a designer's downloaded images and collect everything the assessment needs."""
+    username = designer.get("username", "unknown")
+    name = designer.get("name", username)
+    print(f"  [Analyzer] Analyzing {username}...")
+
+    # ── Analyze downloaded images concurrently ────────────────────────────────
+    shots = designer.get("shots", [])
+    skills = designer.get("skills", [])
+    pending = [(i, shot) for i, shot in enumerate(shots) if shot.get("absolute_path")]
+
+    # The same file re-uploaded under another title is analyzed once and shared
+    duplicates_of: Dict[int, List[int]] = {}
+    first_by_digest: Dict[str, int] = {}
+    unique = []
+    for i, shot in pending:
+        digest = _file_digest(shot["absolute_path"])
+        if digest is not None and digest in first_by_digest:
+            duplicates_of[first_by_digest[digest]].append(i)
+            continue
+        if digest is not None:
+            first_by_digest[digest] = i
+        duplicates_of[i] = []
+        unique.append((i, shot))
+    if len(unique) < len(pending):
+        print(f"    [Analyzer] Skipping {len(pending) - len(unique)} duplicate image(s)")
+    batches = [unique[k:k + VISION_BATCH_SIZE] for k in range(0, len(unique), VISION_BATCH_SIZE)]
+
+    def _analyze_batch(batch: List) -> Dict[int, Optional[Dict]]:
+        if len(batch) == 1:
+            i, shot = batch[0]
+            print(f"    [Analyzer] Analyzing image {i + 1}/{len(shots)}: {shot.get('title', '?')}")
+            return {i: analyze_image(shot["absolute_path"], shot.get("title", "Untitled"), skills, focus_area)}
+        numbers = ", ".join(str(i + 1) for i, _ in batch)
+        print(f"    [Analyzer] Analyzing images {numbers} of {len(shots)} in one request")
+        analyses = analyze_images([shot for _, shot in batch], skills, focus_area)
+        return {i: analysis for (i, _), analysis in zip(batch, analyses)}
+
+    results = {}
+    if batches:
+        with ThreadPoolExecutor(max_workers=min(VISION_MAX_WORKERS, len(batches))) as pool:
+            for future in as_completed([pool.submit(_analyze_batch, b) for b in batches]):
+                results.update(future.result())
+    for i, copies in duplicates_of.items():
+        for j in copies:
+            results[j] = results.get(i)
+
+    # Keep the original shot order regardless of completion order
+    image_analyses = [
+        {"title": shot.get("title", ""), **results[i]}
+        for i, shot in pending
+        if results.get(i)
+    ]
+
+    # ── Summarize for the overall assessment ──────────────────────────────────
+    return PortfolioContext(
+        name=name,
+        username=username,
+        location=designer.get("location", "unknown"),
+        bio=designer.get("bio", ""),
+        skills=skills,
+        followers=designer.get("metrics", {}).get("followers_count", "unknown"),
+        images_analyzed=len(image_analyses),
+        image_scores=_summarize_image_analyses(image_analyses) if image_analyses else {},
+    )
+
+
+def _assessment_prompts(context: PortfolioContext, focus_area: str) -> Tuple[str, str]:
+    """Return the (system, user) prompt pair for a designer's final assessment."""
+    user_prompt = _ASSESSMENT_USER_PROMPT.format_map({
+        "focus_area": focus_area,
+        "schema": _ASSESSMENT_SCHEMA + "\n",
+        "designer_data": orjson.dumps(context, default=str).decode(),
+    })
+    return _ASSESSMENT_SYSTEM_PROMPT, user_prompt
+
+
+def _assessment_cache_key(context: PortfolioContext, focus_area: str) -> str:
+    """Key on everything the assessment sees: model, prompts, keyword and the designer data."""
+    h = hashlib.blake2b(digest_size=16)
+    h.update(f"{GEMINI_ASSESSMENT_MODEL}\0{focus_area}\0".encode())
+    h.update(_ASSESSMENT_SYSTEM_PROMPT.encode())
+    h.update(_ASSESSMENT_SCHEMA.encode())
+    h.update(_ASSESSMENT_USER_PROMPT.encode())
+    h.update(orjson.dumps(context, default=str))
+    return h.hexdigest()
+
+
+def _cached_assessment(context: PortfolioContext, focus_area: str) -> Optional[Dict]:
+    cached = assessment_cache.get(_assessment_cache_key(context, focus_area))
+    if not cached:
+        return None
+    print(f"  [Analyzer] Using cached assessment for {context.username}")
+    return orjson.loads(cached)
+
 
-        if not result_text:
-            print(f"  [Analyzer] WARNING: Gemini returned empty response for {username} after all retries")
+def _finalize_assessment(context: PortfolioContext, focus_area: str, result_text: str) -> Dict:
+    """Parse the model's assessment JSON, falling back to a neutral assessment on failure."""
+    username = context.username
+    if not result_text:
+        print(f"  [Analyzer] WARNING: Gemini returned empty response for {username} after all retries")
+    else:
+        parsed = _parse_json_from_text(result_text)
+
+        if isinstance(parsed, dict):
+            if "overall_score" not in parsed:
+                parsed["overall_score"] = round((parsed.get("overall_rating", 2.5) / 5.0) * 100)
+            print(f"  [Analyzer] Score: {parsed.get('overall_score', '?')} — {parsed.get('recommendation', {}).get('decision', '?')}")
+            assessment_cache.set(
+                _assessment_cache_key(context, focus_area), orjson.dumps(parsed).decode(), expire=ASSESSMENT_CACHE_TTL
+            )
+            return parsed
         else:
-            parsed = _parse_json_from_text(result_text)
+            print(f"  [Analyzer] WARNING: Could not parse JSON from Gemini response for {username}")
+            print(f"  [Analyzer] Raw response (first 500 chars): {result_text[:500]}")
 
-            if isinstance(parsed, dict):
-                if "overall_score" not in parsed:
-                    parsed["overall_score"] = round((parsed.get("overall_rating", 2.5) / 5.0) * 100)
-                print(f"  [Analyzer] Score: {parsed.get('overall_score', '?')} — {parsed.get('recommendation', {}).get('decision', '?')}")
-                return parsed
-            else:
-                print(f"  [Analyzer] WARNING: Could not parse JSON from Gemini response for {username}")
-                print(f"  [Analyzer] Raw response (first 500 chars): {result_text[:500]}")
+    print(f"  [Analyzer] Using fallback analysis for {username}")
+    return copy.deepcopy(_FALLBACK_ANALYSIS)
+
+
+def _no_images_fallback(username: str) -> Dict:
+    """No image could be analyzed: skip the LLM rather than score a portfolio it can't see."""
+    print(f"  [Analyzer] No images analyzed for {username} — using fallback analysis")
+    return copy.deepcopy(_FALLBACK_ANALYSIS)
+
+
+def _assess_online(context: PortfolioContext, focus_area: str) -> Dict:
+    """Run a designer's final assessment as a regular (streamed) Gemini request."""
+    username = context.username
+    if not context.images_analyzed:
+        return _no_images_fallback(username)
+    cached = _cached_assessment(context, focus_area)
+    if cached:
+        return cached
+    result_text = ""
+    try:
+        system, user_prompt = _assessment_prompts(context, focus_area)
+        print(f"  [Analyzer] Generating final assessment for {username}...")
+        result_text = _gemini_text_stream(
+            system, user_prompt, max_tokens=8192, retries=3, json_mode=True,
+            required_keys=_ASSESSMENT_REQUIRED_KEYS,
+        )
     except Exception as e:
         print(f"  [Analyzer] Error generating assessment for {username}: {e}")
+        print(f"  [Analyzer] Using fallback analysis for {username}")
+        return copy.deepcopy(_FALLBACK_ANALYSIS)
+    return _finalize_assessment(context, focus_area, result_text)
 
-    # Fallback
-    print(f"  [Analyzer] Using fallback analysis for {username}")
+
+def analyze_designer(designer: Dict, focus_area: str) -> Dict:
+    """
+    Produce a full talent analysis for a single designer using Gemini.
+    Analyzes their downloaded images, then produces scores and recommendation.
+    """
+    return _assess_online(_build_portfolio_context(designer, focus_area), focus_area)
+
+
+# ── Batch assessments ─────────────────────────────────────────────────────────
+
+_BATCH_FINISHED_STATES = {
+    types.JobState.JOB_STATE_SUCCEEDED,
+    types.JobState.JOB_STATE_PARTIALLY_SUCCEEDED,
+    types.JobState.JOB_STATE_FAILED,
+    types.JobState.JOB_STATE_CANCELLED,
+    types.JobState.JOB_STATE_EXPIRED,
+}
+
+
+def submit_batch_assessments(contexts: List[PortfolioContext], focus_area: str) -> List[str]:
+    """
+    Run the final assessments for many designers as one Gemini Batch API job.
+    Returns the raw response text per context, in order ("" where a request failed).
+    Raises if the job can't be created, fails as a whole, or exceeds BATCH_TIMEOUT_SECONDS.
+    """
+    lines = []
+    for i, context in enumerate(contexts):
+        system, user_prompt = _assessment_prompts(context, focus_area)
+        lines.append(orjson.dumps({
+            "key": str(i),
+            "request": {
+                "contents": [{"role": "user", "parts": [{"text": user_prompt}]}],
+                "system_instruction": {"parts": [{"text": system}]},
+                "generation_config": {
+                    "max_output_tokens": 8192,
+                    "temperature": 0.2,
+                    "response_mime_type": "application/json",
+                },
+            },
+        }, default=str))
+
+    client = get_gemini_client()
+    uploaded = client.files.upload(
+        file=io.BytesIO(b"\n".join(lines)),
+        config=types.UploadFileConfig(display_name="talentlens-assessments", mime_type="jsonl"),
+    )
+    job = client.batches.create(
+        model=GEMINI_ASSESSMENT_MODEL,
+        src=uploaded.name,
+        config=types.CreateBatchJobConfig(display_name=f"talentlens-{focus_area}"[:128]),
+    )
+    print(f"[Analyzer] Submitted batch {job.name} with {len(contexts)} assessments")
+
+    deadline = time.monotonic() + BATCH_TIMEOUT_SECONDS
+    while job.state not in _BATCH_FINISHED_STATES:
+        if time.monotonic() > deadline:
+            client.batches.cancel(name=job.name)
+            raise TimeoutError(f"batch {job.name} still {job.state.value} after {BATCH_TIMEOUT_SECONDS}s")
+        time.sleep(BATCH_POLL_SECONDS)
+        job = client.batches.get(name=job.name)
+        print(f"[Analyzer] Batch {job.name}: {job.state.value}")
+
+    if job.state not in (types.JobState.JOB_STATE_SUCCEEDED, types.JobState.JOB_STATE_PARTIALLY_SUCCEEDED):
+        raise RuntimeError(f"batch {job.name} ended as {job.state.value}: {job.error}")
+
+    results = [""] * len(contexts)
+    for line in client.files.download(file=job.dest.file_name).splitlines():
+        if not line.strip():
+            continue
+        entry = orjson.loads(line)
+        try:
+            i = int(entry["key"])
+            parts = entry["response"]["candidates"][0]["content"]["parts"]
+            results[i] = "".join(part.get("text", "") for part in parts)
+        except (KeyError, IndexError, TypeError, ValueError):
+            print(f"  [Analyzer] Batch request {entry.get('key')} failed: {entry.get('error', 'no response')}")
+    return results
+
+
+def _map_designers(fn, indices: List[int], designers: List[Dict]) -> Dict[int, object]:
+    """
+    Run fn(i) for each index on a worker pool. A designer whose call raises
+    maps to None, so one failure never sinks the rest of the run.
+    """
+    results: Dict[int, object] = {}
+    with ThreadPoolExecutor(max_workers=min(DESIGNER_MAX_WORKERS, len(indices))) as pool:
+        futures = {pool.submit(fn, i): i for i in indices}
+        for future in as_completed(futures):
+            i = futures[future]
+            try:
+                results[i] = future.result()
+            except Exception as e:
+                print(f"  [Analyzer] Error analyzing {designers[i].get('username', 'unknown')}: {e}")
+                results[i] = None
+    return results
+
+
+def _analyze_designers_batched(designers: List[Dict], focus_area: str) -> List[Dict]:
+    """Analyze images online, then send every final assessment through the Batch API."""
+    built = _map_designers(lambda i: _build_portfolio_context(designers[i], focus_area),
+                           list(range(len(designers))), designers)
+    contexts: List[Optional[PortfolioContext]] = [built[i] for i in range(len(designers))]
+
+    analyses: List[Optional[Dict]] = [
+        copy.deepcopy(_FALLBACK_ANALYSIS) if c is None
+        else _cached_assessment(c, focus_area) if c.images_analyzed
+        else _no_images_fallback(c.username)
+        for c in contexts
+    ]
+    misses = [i for i, analysis in enumerate(analyses) if analysis is None]
+    if not misses:
+        return analyses
+
+    try:
+        texts = submit_batch_assessments([contexts[i] for i in misses], focus_area)
+    except Exception as e:
+        print(f"[Analyzer] Batch assessment failed ({e}), falling back to online requests")
+        texts = [""] * len(misses)
+
+    # Requests that failed inside the batch (or the whole batch) are retried online
+    retry = []
+    for i, text in zip(misses, texts):
+        if text:
+            analyses[i] = _finalize_assessment(contexts[i], focus_area, text)
+        else:
+            retry.append(i)
+    if retry:
+        online = _map_designers(lambda i: _assess_online(contexts[i], focus_area), retry, designers)
+        for i in retry:
+            analyses[i] = online[i] or copy.deepcopy(_FALLBACK_ANALYSIS)
+    return analyses
+
+
+def _build_profile(designer: Dict, analysis: Dict) -> Dict:
+    """Assemble the profile object the TalentLens frontend expects (pure, no I/O)."""
+    username = designer.get("username", "")
+
+    # Flatten social links into a list of URLs
+    social_links_dict = designer.get("social_links", {})
+    flat_links = []
+    if isinstance(social_links_dict, dict):
+        for key, val in social_links_dict.items():
+            if key == "other" and isinstance(val, list):
+                flat_links.extend([v for v in val if v])
+            elif isinstance(val, str) and val:
+                flat_links.append(val)
+
+    # Build the profile object the frontend expects
     return {
-        "overall_rating": 2.5,
-        "overall_score": 50,
-        "metrics": {
-            "design_excellence": {"rating": 2.5, "reasoning": "Analysis failed"},
-            "ux_mastery": {"rating": 2.5, "reasoning": "Analysis failed"},
-            "industry_expertise": {"rating": 2.5, "reasoning": "Analysis failed"},
-            "technical_sophistication": {"rating": 2.5, "reasoning": "Analysis failed"},
-            "innovation_creativity": {"rating": 2.5, "reasoning": "Analysis failed"},
-            "specialization_alignment": {"rating": 2.5, "reasoning": "Analysis failed"},
-            "market_positioning": {"rating": 2.5, "reasoning": "Analysis failed"},
-        },
-        "strengths": ["Manual review required"],
-        "areas_for_improvement": ["Analysis failed"],
-        "recommendation": {
-            "decision": "CONSIDER",
-            "confidence": "LOW",
-            "reasoning": "Automated analysis failed — manual review needed",
-            "suitable_roles": ["Unknown"],
-        },
-        "detailed_feedback": {
-            "what_stands_out": "Analysis failed",
-            "biggest_concerns": "System error",
-            "growth_potential": "Unknown",
-            "industry_fit": "Unknown",
+        "original_data": {
+            "name": designer.get("name", ""),
+            "username": username,
+            "location": designer.get("location", ""),
+            "bio": designer.get("bio", ""),
+            "followers_count": designer.get("metrics", {}).get("followers_count", "0"),
+            "specializations": designer.get("skills", []),
+            "available_for_work": designer.get("available_for_work", False),
+            "social_links": flat_links,
+            "contact": designer.get("contact", {}),
+            "profile_url": designer.get("profile_url", ""),
         },
+        "final_analysis": analysis,
+        "relevant_works": [
+            {
+                "id": str(i),
+                "title": shot.get("title", ""),
+                "images": [
+                    {
+                        "original_url": shot.get("original_url", ""),
+                        "local_path": shot.get("local_path", ""),
+                    }
+                ],
+            }
+            for i, shot in enumerate(designer.get("shots", []))
+        ],
+        "social_media_links": flat_links,
+        "processed_at": designer.get("scraped_at", ""),
     }
 
 
@@ -408,56 +1145,28 @@ def analyze_all_designers(scraped_data: Dict, focus_area: str) -> List[Dict]:
     designers = scraped_data.get("designers", [])
     print(f"\n[Analyzer] Analyzing {len(designers)} designers for '{focus_area}'...")
 
-    processed = []
-    for designer in designers:
-        username = designer.get("username", "")
-
-        # Run analysis
-        analysis = analyze_designer(designer, focus_area)
-
-        # Flatten social links into a list of URLs
-        social_links_dict = designer.get("social_links", {})
-        flat_links = []
-        if isinstance(social_links_dict, dict):
-            for key, val in social_links_dict.items():
-                if key == "other" and isinstance(val, list):
-                    flat_links.extend([v for v in val if v])
-                elif isinstance(val, str) and val:
-                    flat_links.append(val)
-
-        # Build the profile object the frontend expects
-        profile = {
-            "original_data": {
-                "name": designer.get("name", ""),
-                "username": username,
-                "location": designer.get("location", ""),
-                "bio": designer.get("bio", ""),
-                "followers_count": designer.get("metrics", {}).get("followers_count", "0"),
-                "specializations": designer.get("skills", []),
-                "available_for_work": designer.get("available_for_work", False),
-                "social_links": flat_links,
-                "contact": designer.get("contact", {}),
-                "profile_url": designer.get("profile_url", ""),
-            },
-            "final_analysis": analysis,
-            "relevant_works": [
-                {
-                    "id": str(i),
-                    "title": shot.get("title", ""),
-                    "images": [
-                        {
-                            "original_url": shot.get("original_url", ""),
-                            "local_path": shot.get("local_path", ""),
-                        }
-                    ],
-                }
-                for i, shot in enumerate(designer.get("shots", []))
-            ],
-            "social_media_links": flat_links,
-            "processed_at": designer.get("scraped_at", ""),
-        }
-        processed.append(profile)
-        time.sleep(3)
+    # Designers are independent, so one designer's final assessment overlaps
+    # with the next designer's image analyses; each profile is assembled in
+    # its worker as soon as the analysis lands, and reported as it finishes
+    processed: List[Optional[Dict]] = [None] * len(designers)
+    if designers and USE_BATCH_API:
+        analyses = _analyze_designers_batched(designers, focus_area)
+        processed = [_build_profile(d, a) for d, a in zip(designers, analyses)]
+    elif designers:
+        with ThreadPoolExecutor(max_workers=min(DESIGNER_MAX_WORKERS, len(designers))) as pool:
+            futures = {
+                pool.submit(lambda d: _build_profile(d, analyze_designer(d, focus_area)), d): i
+                for i, d in enumerate(designers)
+            }
+            for done, future in enumerate(as_completed(futures), 1):
+                i = futures[future]
+                username = designers[i].get("username", "unknown")
+                try:
+                    processed[i] = future.result()
+                except Exception as e:
+                    print(f"  [Analyzer] Error analyzing {username}: {e}")
+                    processed[i] = _build_profile(designers[i], copy.deepcopy(_FALLBACK_ANALYSIS))
+                print(f"[Analyzer] Progress: {done}/{len(designers)} designers ({username} done)")
 
     print(f"[Analyzer] Done. {len(processed)} profiles analyzed.")
     return processed
@@ -10,14 +10,26 @@ import io
 import re
 import json
 import time
+import random
+import orjson
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import tempfile
+import hashlib
+import threading
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass
 from typing import Dict, Optional, List
 
 from google import genai
 from google.genai import types
+from google.genai import errors as genai_errors
 from dotenv import load_dotenv
 
+from llm_cache import CACHE_DIR, DiskCache, SemanticCache
+
 load_dotenv()
 
 # ─── Config ───────────────────────────────────────────────────────────────────
@@ -31,13 +43,124 @@ GEMINI_API_KEY = _clean_env("GEMINI_API_KEY") or _clean_env("GOOGLE_API_KEY")
 GEMINI_ASSESSMENT_MODEL = _clean_env("GEMINI_ASSESSMENT_MODEL", "gemini-2.5-flash")
 GITHUB_TOKEN = _clean_env("GITHUB_TOKEN")
 
+# Gemini requests in flight at once, and candidates analyzed side by side (dev_module.analysis_pool)
+GEMINI_MAX_CONCURRENCY = int(_clean_env("DEV_GEMINI_CONCURRENCY", "5"))
+DEV_MAX_WORKERS = int(_clean_env("DEV_ANALYZER_WORKERS", "4"))
+
 gemini_client = genai.Client(api_key=GEMINI_API_KEY)
+gemini_slots = threading.BoundedSemaphore(max(GEMINI_MAX_CONCURRENCY, 1))
+
+# Exact-match cache for Gemini responses: identical (model, prompts, settings) are
+# deterministic enough at temperature 0.2 that re-runs needn't pay again
+LLM_CACHE_ENABLED = _clean_env("LLM_CACHE_ENABLED") == "1"
+LLM_CACHE_TTL = 7 * 86400
+llm_cache = DiskCache(os.path.join(CACHE_DIR, "dev_llm.sqlite3")) if LLM_CACHE_ENABLED else None
+
+# Recently fetched GitHub profiles are reused for this many seconds (0 = off)
+GITHUB_CACHE_TTL = int(_clean_env("GITHUB_CACHE_TTL", "900"))
+github_cache = DiskCache(os.path.join(CACHE_DIR, "dev_github.sqlite3")) if GITHUB_CACHE_TTL > 0 else None
+
+# Send resume PDFs to Gemini as-is (Files API, native PDF parsing) instead of
+# extracting text locally; uploads are reused for 47h (Gemini keeps them 48h)
+RESUME_NATIVE_PDF = _clean_env("RESUME_NATIVE_PDF") == "1"
+PDF_UPLOAD_TTL = 47 * 3600
+_pdf_uploads = {}  # sha256 of PDF bytes -> (types.File, reuse-until timestamp)
+_pdf_uploads_lock = threading.Lock()
+
+# Resume downloads in flight at once; file hosts (e.g. Drive) answer 429 when hammered
+RESUME_DOWNLOAD_CONCURRENCY = int(_clean_env("DEV_RESUME_DOWNLOADS", "5"))
+download_slots = threading.BoundedSemaphore(max(RESUME_DOWNLOAD_CONCURRENCY, 1))
+
+# Shared keep-alive session for GitHub and resume downloads, so calls reuse TCP/TLS
+# connections. Transient gateway errors are retried with backoff; GraphQL queries
+# are read-only, so retrying the POST is safe. Auth headers are set per request
+# because the same session talks to third-party file hosts.
+_http_retry = Retry(
+    total=3,
+    backoff_factor=0.5,
+    status_forcelist=[502, 503, 504],
+    allowed_methods=frozenset({"GET", "POST"}),
+    raise_on_status=False,
+)
+http_session = requests.Session()
+http_session.mount("https://", HTTPAdapter(pool_connections=10, pool_maxsize=50, max_retries=_http_retry))
+http_session.mount("http://", HTTPAdapter(pool_connections=10, pool_maxsize=50, max_retries=_http_retry))
+
+# Reuse resume extractions for near-duplicate resumes (e.g. the same CV re-exported),
+# matched by embedding cosine similarity and accepted only when both resumes
+# share an email address, so two people on the same template never swap data
+RESUME_SEMANTIC_CACHE_ENABLED = _clean_env("RESUME_SEMANTIC_CACHE") == "1"
+GEMINI_EMBEDDING_MODEL = _clean_env("GEMINI_EMBEDDING_MODEL", "text-embedding-004")
+RESUME_SIMILARITY_THRESHOLD = float(_clean_env("RESUME_SIMILARITY_THRESHOLD", "0.95"))
+resume_cache = (
+    SemanticCache(os.path.join(CACHE_DIR, "dev_resumes.sqlite3"), threshold=RESUME_SIMILARITY_THRESHOLD)
+    if RESUME_SEMANTIC_CACHE_ENABLED else None
+)
 
 
 # ─── Gemini Helper ────────────────────────────────────────────────────────────
 
+class TransientAnalysisError(Exception):
+    """
+    A GitHub, resume or Gemini call kept failing in a way that may succeed
+    later (429, 5xx, timeout, empty model reply). Raised instead of returning
+    placeholder data so callers can retry the whole analysis.
+    """
+
+
+def _transient_http_error(error: Exception) -> bool:
+    """True for timeouts, dropped connections, exhausted retries and 429/5xx responses."""
+    if isinstance(error, (requests.Timeout, requests.ConnectionError, requests.exceptions.RetryError)):
+        return True
+    response = getattr(error, "response", None)
+    if isinstance(error, requests.HTTPError) and response is not None:
+        return response.status_code == 429 or response.status_code >= 500
+    return False
+
+
+def _llm_cache_key(system: str, user: str, max_tokens: int, json_mode: bool) -> str:
+    payload = {"m": GEMINI_ASSESSMENT_MODEL, "s": system, "u": user, "t": 0.2, "j": json_mode, "mt": max_tokens}
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode()).hexdigest()
+
+
+def _backoff_delay(attempt: int, error: Optional[Exception] = None) -> float:
+    """
+    Exponential back-off (1s, 2s, 4s...) plus up to 0.5s of jitter so workers
+    that failed together don't retry together. A 429/503 that carries a
+    Retry-After header waits at least that long.
+    """
+    delay = 2 ** attempt + random.uniform(0, 0.5)
+    if getattr(error, "code", None) in (429, 503):
+        headers = getattr(getattr(error, "response", None), "headers", None) or {}
+        try:
+            delay = max(delay, float(headers.get("retry-after") or 0))
+        except (TypeError, ValueError):
+            pass
+    return delay
+
+
 def _gemini_text(system: str, user: str, max_tokens: int = 4096,
-                 retries: int = 3, json_mode: bool = False) -> str:
+                 retries: int = 3, json_mode: bool = False,
+                 files: Optional[List[types.File]] = None) -> str:
+    """
+    `files` are Files API uploads sent ahead of the user prompt.
+    Returns "" if the request is rejected outright (bad request, auth) and
+    raises TransientAnalysisError once retries run out on rate limits,
+    server errors or empty replies.
+    """
+    cache_key = None
+    if llm_cache is not None:
+        # Key attachments by content hash: upload URIs change between runs
+        file_ids = "".join(f"\0{f.sha256_hash or f.uri}" for f in files or [])
+        cache_key = _llm_cache_key(system, user + file_ids, max_tokens, json_mode)
+        cached = llm_cache.get(cache_key)
+        print(f"    [DevAnalyzer] LLM cache {'hit' if cached else 'miss'} "
+              f"({llm_cache.hits} hits / {llm_cache.misses} misses)")
+        if cached:
+            return cached
+
+    error = None
+    transient = False
     for attempt in range(retries):
         try:
             config_args = dict(
@@ -47,56 +170,64 @@ def _gemini_text(system: str, user: str, max_tokens: int = 4096,
             )
             if json_mode:
                 config_args["response_mime_type"] = "application/json"
-            response = gemini_client.models.generate_content(
-                model=GEMINI_ASSESSMENT_MODEL,
-                contents=user,
-                config=types.GenerateContentConfig(**config_args),
-            )
+            with gemini_slots:
+                response = gemini_client.models.generate_content(
+                    model=GEMINI_ASSESSMENT_MODEL,
+                    contents=[*files, user] if files else user,
+                    config=types.GenerateContentConfig(**config_args),
+                )
             text = response.text or ""
             if text:
+                if cache_key:
+                    llm_cache.set(cache_key, text, expire=LLM_CACHE_TTL)
                 return text
             print(f"    [DevAnalyzer] Empty response (attempt {attempt+1}/{retries})")
+            transient = True
         except Exception as e:
+            error = e
             print(f"    [DevAnalyzer] API error (attempt {attempt+1}/{retries}): {e}")
+            if isinstance(e, genai_errors.ClientError) and e.code not in (408, 429):
+                transient = False
+                break  # bad request / auth / not found won't succeed on retry
+            transient = True
         if attempt < retries - 1:
-            time.sleep(3 * (attempt + 1))
+            time.sleep(_backoff_delay(attempt, error))
+            error = None
+    if transient:
+        raise TransientAnalysisError(f"Gemini call failed after {retries} attempts")
     return ""
 
 
+_EMAIL_RE = re.compile(r"[\w.+-]+@[\w-]+(?:\.[\w-]+)+")
+_JSON_FENCE_RE = re.compile(r"```json\s*(.*?)```", re.DOTALL)
+_JSON_OBJ_RE = re.compile(r"\{.*\}", re.DOTALL)
+
+
 def _parse_json(text: str):
     try:
-        return json.loads(text)
-    except json.JSONDecodeError:
+        return orjson.loads(text)
+    except orjson.JSONDecodeError:
         pass
-    if "```json" in text:
-        s = text.find("```json") + 7
-        e = text.find("```", s)
-        try:
-            return json.loads(text[s:e].strip())
-        except Exception:
-            pass
-    m = re.search(r'\{.*\}', text, re.DOTALL)
-    if m:
-        try:
-            return json.loads(m.group())
-        except Exception:
-            pass
+    for pattern, group in ((_JSON_FENCE_RE, 1), (_JSON_OBJ_RE, 0)):
+        m = pattern.search(text)
+        if m:
+            try:
+                return orjson.loads(m.group(group).strip())
+            except orjson.JSONDecodeError:
+                pass
     return None
 
 
 # ─── GitHub GraphQL Analysis ──────────────────────────────────────────────────
 
-GITHUB_GRAPHQL_QUERY = """
-query($login: String!) {
-  user(login: $login) {
+GITHUB_USER_FIELDS = """
     name
     bio
     company
     location
-    createdAt
     followers { totalCount }
-    following { totalCount }
-    repositories(first: 100, ownerAffiliations: OWNER, orderBy: {field: STARGAZERS, direction: DESC}) {
+    ownRepos: repositories(ownerAffiliations: OWNER, isFork: false) { totalCount }
+    repositories(first: 30, ownerAffiliations: OWNER, orderBy: {field: STARGAZERS, direction: DESC}) {
       totalCount
       nodes {
         name
@@ -104,7 +235,6 @@ query($login: String!) {
         stargazerCount
         forkCount
         primaryLanguage { name }
-        updatedAt
         isFork
       }
     }
@@ -128,35 +258,150 @@ query($login: String!) {
         }
       }
     }
-  }
-}
 """
 
+GITHUB_GRAPHQL_QUERY = f"""
+query($login: String!) {{
+  user(login: $login) {{{GITHUB_USER_FIELDS}  }}
+}}
+"""
+
+GITHUB_GRAPHQL_URL = "https://api.github.com/graphql"
+
+# Users fetched per aliased GraphQL request; larger batches start hitting GitHub's
+# query cost/timeout limits
+GITHUB_BATCH_SIZE = 10
+
+
+def _github_headers() -> Dict:
+    return {
+        "Authorization": f"Bearer {GITHUB_TOKEN}",
+        "Content-Type": "application/json",
+    }
+
+
+@dataclass(slots=True)
+class GitHubProfile:
+    """Condensed GitHub profile; converted with asdict() where JSON is needed."""
+    username: str
+    name: str
+    bio: str
+    company: str
+    location: str
+    followers: int
+    total_repos: int
+    own_repos: int
+    total_stars: int
+    top_languages: List[Dict]
+    pinned_repos: List[Dict]
+    contributions: Dict
+    top_repos: List[Dict]
+
+
+def _shape_user(user: Dict, username: str) -> GitHubProfile:
+    """Condense a GraphQL `user` node into the profile summary used for evaluation."""
+    # Process repos: own (non-fork) repos, their stars and top languages in one pass
+    repos = user.get("repositories", {}).get("nodes", [])
+    own_repos = []
+    total_stars = 0
+    lang_count = Counter()
+    for r in repos:
+        if r.get("isFork", False):
+            continue
+        own_repos.append(r)
+        total_stars += r.get("stargazerCount", 0)
+        lang = (r.get("primaryLanguage") or {}).get("name")
+        if lang:
+            lang_count[lang] += 1
+    top_languages = lang_count.most_common(8)
+
+    # Pinned repos
+    pinned = []
+    for p in user.get("pinnedItems", {}).get("nodes", []):
+        pinned.append({
+            "name": p.get("name", ""),
+            "description": p.get("description", ""),
+            "stars": p.get("stargazerCount", 0),
+            "language": (p.get("primaryLanguage") or {}).get("name", ""),
+            "url": p.get("url", ""),
+        })
+
+    contribs = user.get("contributionsCollection", {})
+
+    profile = GitHubProfile(
+        username=username,
+        name=user.get("name", ""),
+        bio=user.get("bio", ""),
+        company=user.get("company", ""),
+        location=user.get("location", ""),
+        followers=user.get("followers", {}).get("totalCount", 0),
+        total_repos=user.get("repositories", {}).get("totalCount", 0),
+        own_repos=(user.get("ownRepos") or {}).get("totalCount", len(own_repos)),
+        total_stars=total_stars,
+        top_languages=[{"language": l, "count": c} for l, c in top_languages],
+        pinned_repos=pinned,
+        contributions={
+            "total": contribs.get("contributionCalendar", {}).get("totalContributions", 0),
+            "commits": contribs.get("totalCommitContributions", 0),
+            "pull_requests": contribs.get("totalPullRequestContributions", 0),
+            "issues": contribs.get("totalIssueContributions", 0),
+            "repos_created": contribs.get("totalRepositoryContributions", 0),
+        },
+        top_repos=[
+            {
+                "name": r.get("name", ""),
+                "description": (r.get("description") or "")[:100],
+                "stars": r.get("stargazerCount", 0),
+                "forks": r.get("forkCount", 0),
+                "language": (r.get("primaryLanguage") or {}).get("name", ""),
+            }
+            for r in own_repos[:5]
+        ],
+    )
+
+    print(f"  [GitHub] {username}: {profile.total_repos} repos, "
+          f"{total_stars} stars, {profile.contributions['total']} contributions")
+    return profile
+
+
+def _cached_github(username: str) -> Optional[Dict]:
+    if github_cache is None:
+        return None
+    cached = github_cache.get(username)
+    return orjson.loads(cached) if cached else None
+
+
+def _store_github(username: str, profile: Dict):
+    if github_cache is not None:
+        github_cache.set(username, orjson.dumps(profile).decode(), expire=GITHUB_CACHE_TTL)
+
 
 def analyze_github(username: str) -> Optional[Dict]:
-    """Fetch GitHub profile data via GraphQL API."""
+    """Fetch GitHub profile data via GraphQL API (served from github_cache when fresh)."""
     if not username or not GITHUB_TOKEN:
         print(f"  [GitHub] Skipping — {'no username' if not username else 'no GITHUB_TOKEN'}")
         return None
 
-    headers = {
-        "Authorization": f"Bearer {GITHUB_TOKEN}",
-        "Content-Type": "application/json",
-    }
+    cached = _cached_github(username)
+    if cached:
+        print(f"  [GitHub] Using cached profile for {username}")
+        return cached
 
     try:
         print(f"  [GitHub] Fetching profile for {username}...")
-        resp = requests.post(
-            "https://api.github.com/graphql",
-            headers=headers,
+        resp = http_session.post(
+            GITHUB_GRAPHQL_URL,
+            headers=_github_headers(),
             json={"query": GITHUB_GRAPHQL_QUERY, "variables": {"login": username}},
             timeout=15,
         )
         resp.raise_for_status()
-        data = resp.json()
+        data = orjson.loads(resp.content)
 
         if "errors" in data:
             print(f"  [GitHub] GraphQL errors: {data['errors']}")
+            if any(err.get("type") == "RATE_LIMITED" for err in data["errors"]):
+                raise TransientAnalysisError(f"GitHub rate limit hit fetching {username}")
             return None
 
         user = data.get("data", {}).get("user")
@@ -164,76 +409,235 @@ def analyze_github(username: str) -> Optional[Dict]:
             print(f"  [GitHub] User '{username}' not found")
             return None
 
-        # Process repos
-        repos = user.get("repositories", {}).get("nodes", [])
-        own_repos = [r for r in repos if not r.get("isFork", False)]
-        total_stars = sum(r.get("stargazerCount", 0) for r in own_repos)
-
-        # Top languages
-        lang_count = {}
-        for r in own_repos:
-            lang = r.get("primaryLanguage", {})
-            if lang and lang.get("name"):
-                lang_count[lang["name"]] = lang_count.get(lang["name"], 0) + 1
-        top_languages = sorted(lang_count.items(), key=lambda x: -x[1])[:8]
-
-        # Pinned repos
-        pinned = []
-        for p in user.get("pinnedItems", {}).get("nodes", []):
-            pinned.append({
-                "name": p.get("name", ""),
-                "description": p.get("description", ""),
-                "stars": p.get("stargazerCount", 0),
-                "language": (p.get("primaryLanguage") or {}).get("name", ""),
-                "url": p.get("url", ""),
-            })
-
-        contribs = user.get("contributionsCollection", {})
-
-        result = {
-            "username": username,
-            "name": user.get("name", ""),
-            "bio": user.get("bio", ""),
-            "company": user.get("company", ""),
-            "location": user.get("location", ""),
-            "created_at": user.get("createdAt", ""),
-            "followers": user.get("followers", {}).get("totalCount", 0),
-            "following": user.get("following", {}).get("totalCount", 0),
-            "total_repos": user.get("repositories", {}).get("totalCount", 0),
-            "own_repos": len(own_repos),
-            "total_stars": total_stars,
-            "top_languages": [{"language": l, "count": c} for l, c in top_languages],
-            "pinned_repos": pinned,
-            "contributions": {
-                "total": contribs.get("contributionCalendar", {}).get("totalContributions", 0),
-                "commits": contribs.get("totalCommitContributions", 0),
-                "pull_requests": contribs.get("totalPullRequestContributions", 0),
-                "issues": contribs.get("totalIssueContributions", 0),
-                "repos_created": contribs.get("totalRepositoryContributions", 0),
-            },
-            "top_repos": [
-                {
-                    "name": r.get("name", ""),
-                    "description": (r.get("description") or "")[:100],
-                    "stars": r.get("stargazerCount", 0),
-                    "forks": r.get("forkCount", 0),
-                    "language": (r.get("primaryLanguage") or {}).get("name", ""),
-                }
-                for r in own_repos[:5]
-            ],
-        }
-
-        print(f"  [GitHub] {username}: {result['total_repos']} repos, "
-              f"{total_stars} stars, {result['contributions']['total']} contributions")
-        return result
+        profile = asdict(_shape_user(user, username))
+        _store_github(username, profile)
+        return profile
 
+    except TransientAnalysisError:
+        raise
     except Exception as e:
         print(f"  [GitHub] Error fetching {username}: {e}")
+        if _transient_http_error(e):
+            raise TransientAnalysisError(f"GitHub fetch failed for {username}: {e}") from e
         return None
 
 
+def analyze_github_batch(usernames: List[str]) -> Dict[str, Optional[Dict]]:
+    """
+    Fetch many GitHub profiles with one aliased GraphQL request per
+    GITHUB_BATCH_SIZE users (u0: user(login: $login0) { ... } u1: ...).
+
+    Returns {username: profile or None if not found}. Usernames from a batch
+    whose request failed are left out, so callers can fall back to
+    analyze_github for them.
+    """
+    usernames = list(dict.fromkeys(u for u in usernames if u))
+    if not usernames or not GITHUB_TOKEN:
+        return {}
+
+    results = {}
+    for login in usernames:
+        cached = _cached_github(login)
+        if cached:
+            results[login] = cached
+    if results:
+        print(f"  [GitHub] Using {len(results)} cached profiles")
+        usernames = [u for u in usernames if u not in results]
+
+    for start in range(0, len(usernames), GITHUB_BATCH_SIZE):
+        chunk = usernames[start:start + GITHUB_BATCH_SIZE]
+        params = ", ".join(f"$login{i}: String!" for i in range(len(chunk)))
+        aliases = "".join(
+            f"  u{i}: user(login: $login{i}) {{{GITHUB_USER_FIELDS}  }}\n" for i in range(len(chunk))
+        )
+        query = f"query({params}) {{\n{aliases}}}\n"
+        variables = {f"login{i}": login for i, login in enumerate(chunk)}
+
+        try:
+            print(f"  [GitHub] Fetching {len(chunk)} profiles in one request...")
+            resp = http_session.post(
+                GITHUB_GRAPHQL_URL,
+                headers=_github_headers(),
+                json={"query": query, "variables": variables},
+                timeout=30,
+            )
+            resp.raise_for_status()
+            data = orjson.loads(resp.content)
+        except Exception as e:
+            print(f"  [GitHub] Batch error for {', '.join(chunk)}: {e}")
+            continue
+
+        # Unknown logins come back as null aliases alongside NOT_FOUND errors;
+        # the rest of the batch is still usable
+        nodes = data.get("data") or {}
+        if data.get("errors") and not nodes:
+            print(f"  [GitHub] GraphQL errors: {data['errors']}")
+            continue
+        for i, login in enumerate(chunk):
+            user = nodes.get(f"u{i}")
+            if not user:
+                print(f"  [GitHub] User '{login}' not found")
+                results[login] = None
+                continue
+            try:
+                results[login] = asdict(_shape_user(user, login))
+                _store_github(login, results[login])
+            except Exception as e:
+                print(f"  [GitHub] Error processing {login}: {e}")
+                results[login] = None
+
+    return results
+
+
 # ─── Resume PDF Parsing ──────────────────────────────────────────────────────
 
+RESUME_MAX_BYTES = 20 * 1024 * 1024
+
+
+def _download_resume(resume_url: str, retries: int = 3) -> bytes:
+    """
+    Stream a resume file into memory, at most RESUME_DOWNLOAD_CONCURRENCY at a
+    time. 429 responses are retried after Retry-After (or 1s, 2s, 4s...).
+    """
+    for attempt in range(retries):
+        with download_slots:
+            with http_session.get(resume_url, timeout=30, stream=True) as resp:
+                if resp.status_code != 429 or attempt == retries - 1:
+                    resp.raise_for_status()
+                    chunks = []
+                    size = 0
+                    for chunk in resp.iter_content(chunk_size=64 * 1024):
+                        size += len(chunk)
+                        if size > RESUME_MAX_BYTES:
+                            raise ValueError(f"resume larger than {RESUME_MAX_BYTES // (1024 * 1024)} MB")
+                        chunks.append(chunk)
+                    return b"".join(chunks)
+                retry_after = resp.headers.get("Retry-After", "")
+        delay = float(retry_after) if retry_after.isdigit() else 2 ** attempt
+        print(f"  [Resume] Rate limited, retrying in {delay:.0f}s (attempt {attempt+1}/{retries})")
+        time.sleep(delay)
+    return b""
+
+
+# Only this much resume text is sent to the LLM, so later pages needn't be decoded
+RESUME_TEXT_LIMIT = 8000
+
+
+def _extract_pdf_text(pdf_bytes: bytes) -> str:
+    """
+    Extract page text with pypdfium2 (PDFium, native code), falling back to
+    pure-Python PyPDF2 when it isn't installed. Stops once RESUME_TEXT_LIMIT
+    characters have been collected.
+    """
+    text_parts = []
+    collected = 0
+    try:
+        import pypdfium2 as pdfium
+    except ImportError:
+        from PyPDF2 import PdfReader
+        for page in PdfReader(io.BytesIO(pdf_bytes)).pages:
+            page_text = page.extract_text()
+            if page_text:
+                text_parts.append(page_text)
+                collected += len(page_text)
+                if collected >= RESUME_TEXT_LIMIT:
+                    break
+        return "\n".join(text_parts)
+
+    doc = pdfium.PdfDocument(pdf_bytes)
+    try:
+        for page in doc:
+            textpage = page.get_textpage()
+            page_text = textpage.get_text_range()
+            textpage.close()
+            page.close()
+            if page_text:
+                text_parts.append(page_text)
+                collected += len(page_text)
+                if collected >= RESUME_TEXT_LIMIT:
+                    break
+    finally:
+        doc.close()
+    return "\n".join(text_parts)
+
+
+def _embed_resume(resume_text: str) -> Optional[List[float]]:
+    """Embed lowercased, whitespace-collapsed resume text; None if the call fails."""
+    normalized = " ".join(resume_text[:RESUME_TEXT_LIMIT].lower().split())
+    try:
+        with gemini_slots:
+            result = gemini_client.models.embed_content(
+                model=GEMINI_EMBEDDING_MODEL,
+                contents=normalized,
+            )
+        return list(result.embeddings[0].values)
+    except Exception as e:
+        print(f"  [Resume] Embedding error, skipping semantic cache: {e}")
+        return None
+
+
+def _upload_resume_pdf(pdf_bytes: bytes) -> Optional[types.File]:
+    """Upload a PDF through the Files API once per content hash; None if it fails."""
+    digest = hashlib.sha256(pdf_bytes).hexdigest()
+    with _pdf_uploads_lock:
+        entry = _pdf_uploads.get(digest)
+        if entry and entry[1] > time.time():
+            return entry[0]
+    try:
+        with gemini_slots:
+            uploaded = gemini_client.files.upload(
+                file=io.BytesIO(pdf_bytes),
+                config=types.UploadFileConfig(mime_type="application/pdf"),
+            )
+        # Large PDFs are processed asynchronously; they can't be referenced until ACTIVE
+        for _ in range(10):
+            if uploaded.state != types.FileState.PROCESSING:
+                break
+            time.sleep(1)
+            uploaded = gemini_client.files.get(name=uploaded.name)
+        if uploaded.state == types.FileState.FAILED:
+            raise RuntimeError(f"processing failed for {uploaded.name}")
+    except Exception as e:
+        print(f"  [Resume] PDF upload failed, extracting text locally: {e}")
+        return None
+    with _pdf_uploads_lock:
+        _pdf_uploads[digest] = (uploaded, time.time() + PDF_UPLOAD_TTL)
+    return uploaded
+
+
+RESUME_SYSTEM_PROMPT = (
+    "You are an expert recruiter AI. Extract structured information from this resume. "
+    "Return ONLY a valid JSON object. Be concise — 1-2 sentences max per field."
+)
+
+RESUME_SCHEMA = """{
+  "skills": ["skill1", "skill2", ...],
+  "experience_years": <number or estimate>,
+  "education": [
+    { "degree": "...", "institution": "...", "year": "..." }
+  ],
+  "work_experience": [
+    { "title": "...", "company": "...", "duration": "...", "highlights": "1 sentence" }
+  ],
+  "projects": [
+    { "name": "...", "description": "1 sentence", "tech_stack": ["..."] }
+  ],
+  "certifications": ["cert1", "cert2"],
+  "summary": "2-3 sentence professional summary"
+}"""
+
+RESUME_USER_PROMPT = """Extract structured data from this resume. Return ONLY valid JSON:
+
+{schema}
+
+{resume}"""
+
+
+def _log_parsed_resume(parsed: Dict):
+    print(f"  [Resume] Parsed: {len(parsed.get('skills', []))} skills, "
+          f"{parsed.get('experience_years', '?')} years experience")
+
+
 def parse_resume(resume_url: str, candidate_name: str = "") -> Optional[Dict]:
     """Download a PDF resume and extract structured info via LLM."""
     if not resume_url:
@@ -242,19 +646,26 @@ def parse_resume(resume_url: str, candidate_name: str = "") -> Optional[Dict]:
 
     try:
         print(f"  [Resume] Downloading PDF for {candidate_name}...")
-        resp = requests.get(resume_url, timeout=30)
-        resp.raise_for_status()
+        pdf_bytes = _download_resume(resume_url)
+
+        uploaded = _upload_resume_pdf(pdf_bytes) if RESUME_NATIVE_PDF else None
+        if uploaded:
+            print(f"  [Resume] Analyzing uploaded PDF ({len(pdf_bytes) // 1024} KB)...")
+            user_prompt = RESUME_USER_PROMPT.format_map({
+                "schema": RESUME_SCHEMA,
+                "resume": "The resume is the attached PDF.",
+            })
+            result_text = _gemini_text(RESUME_SYSTEM_PROMPT, user_prompt, max_tokens=4096,
+                                       json_mode=True, files=[uploaded])
+            parsed = _parse_json(result_text) if result_text else None
+            if parsed:
+                _log_parsed_resume(parsed)
+                return parsed
+            return None
 
         # Extract text from PDF
         try:
-            from PyPDF2 import PdfReader
-            reader = PdfReader(io.BytesIO(resp.content))
-            text_parts = []
-            for page in reader.pages:
-                page_text = page.extract_text()
-                if page_text:
-                    text_parts.append(page_text)
-            resume_text = "\n".join(text_parts)
+            resume_text = _extract_pdf_text(pdf_bytes)
         except Exception as e:
             print(f"  [Resume] PDF parse error: {e}")
             resume_text = ""
@@ -265,134 +676,101 @@ def parse_resume(resume_url: str, candidate_name: str = "") -> Optional[Dict]:
 
         print(f"  [Resume] Extracted {len(resume_text)} chars, analyzing...")
 
-        system = (
-            "You are an expert recruiter AI. Extract structured information from this resume. "
-            "Return ONLY a valid JSON object. Be concise — 1-2 sentences max per field."
-        )
-
-        user_prompt = f"""Extract structured data from this resume. Return ONLY valid JSON:
-
-{{
-  "skills": ["skill1", "skill2", ...],
-  "experience_years": <number or estimate>,
-  "education": [
-    {{ "degree": "...", "institution": "...", "year": "..." }}
-  ],
-  "work_experience": [
-    {{ "title": "...", "company": "...", "duration": "...", "highlights": "1 sentence" }}
-  ],
-  "projects": [
-    {{ "name": "...", "description": "1 sentence", "tech_stack": ["..."] }}
-  ],
-  "certifications": ["cert1", "cert2"],
-  "summary": "2-3 sentence professional summary"
-}}
-
-RESUME TEXT:
-{resume_text[:8000]}"""
-
-        result_text = _gemini_text(system, user_prompt, max_tokens=4096, json_mode=True)
+        # Without an email there is nothing to tie a cached parse to this person
+        emails = sorted({e.lower() for e in _EMAIL_RE.findall(resume_text)})
+        embedding = _embed_resume(resume_text) if resume_cache is not None and emails else None
+        if embedding:
+            cached, similarity = resume_cache.lookup(embedding)
+            lookups = resume_cache.hits + resume_cache.misses
+            print(f"  [Resume] Semantic cache {'hit' if cached else 'miss'} (similarity {similarity:.3f}, "
+                  f"hit rate {resume_cache.hits}/{lookups})")
+            if cached:
+                entry = orjson.loads(cached)
+                if isinstance(entry, dict) and set(entry.get("emails") or ()) & set(emails):
+                    return entry["parsed"]
+                print("  [Resume] Cached resume belongs to someone else, analyzing fresh")
+
+        user_prompt = RESUME_USER_PROMPT.format_map({
+            "schema": RESUME_SCHEMA,
+            "resume": f"RESUME TEXT:\n{resume_text[:RESUME_TEXT_LIMIT]}",
+        })
+        result_text = _gemini_text(RESUME_SYSTEM_PROMPT, user_prompt, max_tokens=4096, json_mode=True)
         if result_text:
             parsed = _parse_json(result_text)
             if parsed:
-                print(f"  [Resume] Parsed: {len(parsed.get('skills', []))} skills, "
-                      f"{parsed.get('experience_years', '?')} years experience")
+                _log_parsed_resume(parsed)
+                if embedding:
+                    resume_cache.add(embedding, orjson.dumps({"emails": emails, "parsed": parsed}).decode())
                 return parsed
 
+    except TransientAnalysisError:
+        raise
     except Exception as e:
         print(f"  [Resume] Error processing resume for {candidate_name}: {e}")
+        if _transient_http_error(e):
+            raise TransientAnalysisError(f"resume download failed for {candidate_name}: {e}") from e
 
     return None
 
 
 # ─── LLM Evaluation ──────────────────────────────────────────────────────────
 
-def evaluate_candidate(candidate: Dict, role: Dict,
-                       github_data: Optional[Dict],
-                       resume_data: Optional[Dict]) -> Dict:
-    """Evaluate a developer candidate against a role using Gemini."""
-
-    system = (
-        "You are an expert technical recruiter AI. Evaluate this developer candidate "
-        "against the role requirements. Be FAIR but thorough.\n"
-        "SCORING GUIDELINES:\n"
-        "- Average developer = overall_score 60-70\n"
-        "- Good developer with solid portfolio = 70-80\n"
-        "- Very talented with standout work = 80-90\n"
-        "- Elite, world-class = 90+\n"
-        "- HIRE >= 71, CONSIDER 41-70, REJECT <= 40\n"
-        "KEEP ALL reasoning strings VERY SHORT — 1-2 sentences max. Be concise."
-    )
-
-    context = {
-        "candidate": {
-            "name": candidate.get("name", ""),
-            "email": candidate.get("email", ""),
-            "current_ctc": candidate.get("current_ctc", ""),
-            "linkedin": candidate.get("linkedin", ""),
-        },
-        "role": {
-            "name": role.get("name", ""),
-            "jd": role.get("jd", ""),
-            "ctc": role.get("ctc", ""),
-        },
-        "github": github_data or "No GitHub data available",
-        "resume": resume_data or "No resume data available",
-    }
-
-    user_prompt = f"""Evaluate this developer candidate for the role. Return ONLY valid JSON:
-
-{{
+EVAL_SYSTEM_PROMPT = (
+    "You are an expert technical recruiter AI. Evaluate this developer candidate "
+    "against the role requirements. Be FAIR but thorough.\n"
+    "SCORING GUIDELINES:\n"
+    "- Average developer = overall_score 60-70\n"
+    "- Good developer with solid portfolio = 70-80\n"
+    "- Very talented with standout work = 80-90\n"
+    "- Elite, world-class = 90+\n"
+    "- HIRE >= 71, CONSIDER 41-70, REJECT <= 40\n"
+    "KEEP ALL reasoning strings VERY SHORT — 1-2 sentences max. Be concise."
+)
+
+# Response schema and thresholds, sent inline with every evaluation
+EVAL_SCHEMA = """{
   "overall_rating": <float 1.0-5.0>,
   "overall_score": <int 20-100>,
-  "metrics": {{
-    "technical_depth": {{ "rating": <float>, "reasoning": "1-2 sentences" }},
-    "project_quality": {{ "rating": <float>, "reasoning": "1-2 sentences" }},
-    "experience_relevance": {{ "rating": <float>, "reasoning": "1-2 sentences" }},
-    "github_activity": {{ "rating": <float>, "reasoning": "1-2 sentences" }},
-    "skill_match": {{ "rating": <float>, "reasoning": "1-2 sentences" }},
-    "overall_fit": {{ "rating": <float>, "reasoning": "1-2 sentences" }}
-  }},
+  "metrics": {
+    "technical_depth": { "rating": <float>, "reasoning": "1-2 sentences" },
+    "project_quality": { "rating": <float>, "reasoning": "1-2 sentences" },
+    "experience_relevance": { "rating": <float>, "reasoning": "1-2 sentences" },
+    "github_activity": { "rating": <float>, "reasoning": "1-2 sentences" },
+    "skill_match": { "rating": <float>, "reasoning": "1-2 sentences" },
+    "overall_fit": { "rating": <float>, "reasoning": "1-2 sentences" }
+  },
   "strengths": ["short", "short", "short"],
   "areas_for_improvement": ["short", "short"],
-  "recommendation": {{
+  "recommendation": {
     "decision": "HIRE|CONSIDER|REJECT",
     "confidence": "HIGH|MEDIUM|LOW",
     "reasoning": "1-2 sentences"
-  }},
-  "detailed_feedback": {{
+  },
+  "detailed_feedback": {
     "technical_assessment": "1-2 sentences",
     "culture_fit": "1 sentence",
     "growth_potential": "1 sentence",
     "salary_alignment": "1 sentence"
-  }}
-}}
+  }
+}
 
 THRESHOLDS: HIRE >= 71, CONSIDER 41-70, REJECT <= 40
 
-CANDIDATE + ROLE DATA:
-{json.dumps(context, indent=2, default=str)}"""
+"""
 
-    try:
-        print(f"  [Eval] Generating assessment for {candidate.get('name', 'unknown')}...")
-        result_text = _gemini_text(system, user_prompt, max_tokens=4096, json_mode=True)
+EVAL_USER_PROMPT = """Evaluate this developer candidate for the role. Return ONLY valid JSON:
 
-        if result_text:
-            parsed = _parse_json(result_text)
-            if parsed and isinstance(parsed, dict):
-                score = parsed.get("overall_score", 50)
-                decision = parsed.get("recommendation", {}).get("decision", "CONSIDER")
-                print(f"  [Eval] {candidate.get('name', 'unknown')}: "
-                      f"score={score}, decision={decision}")
-                return parsed
+{schema}CANDIDATE + ROLE DATA:
+{data}"""
 
-    except Exception as e:
-        print(f"  [Eval] Error evaluating {candidate.get('name', 'unknown')}: {e}")
 
-    # Fallback
+def _fallback_evaluation(overall_rating: float = 3.0, overall_score: int = 50,
+                         decision: str = "CONSIDER",
+                         reasoning: str = "Analysis incomplete — could not fully evaluate candidate.") -> Dict:
+    """Placeholder evaluation used when the LLM can't (or needn't) assess a candidate."""
     return {
-        "overall_rating": 3.0,
-        "overall_score": 50,
+        "overall_rating": overall_rating,
+        "overall_score": overall_score,
         "metrics": {
             "technical_depth": {"rating": 3.0, "reasoning": "Could not fully evaluate"},
             "project_quality": {"rating": 3.0, "reasoning": "Could not fully evaluate"},
@@ -404,9 +782,9 @@ CANDIDATE + ROLE DATA:
         "strengths": ["Pending full evaluation"],
         "areas_for_improvement": ["Pending full evaluation"],
         "recommendation": {
-            "decision": "CONSIDER",
+            "decision": decision,
             "confidence": "LOW",
-            "reasoning": "Analysis incomplete — could not fully evaluate candidate.",
+            "reasoning": reasoning,
         },
         "detailed_feedback": {
             "technical_assessment": "Pending evaluation",
@@ -417,25 +795,103 @@ CANDIDATE + ROLE DATA:
     }
 
 
+def evaluate_candidate(candidate: Dict, role: Dict,
+                       github_data: Optional[Dict],
+                       resume_data: Optional[Dict]) -> Dict:
+    """Evaluate a developer candidate against a role using Gemini."""
+    # Without GitHub or resume data the model only sees a name and CTC, so skip the call.
+    # A candidate who gave neither is rejected outright (roles can opt out with
+    # "strict": False); one whose links couldn't be read keeps the neutral fallback.
+    if not github_data and not resume_data:
+        if not candidate.get("github_username") and not candidate.get("resume_url"):
+            if role.get("strict", True):
+                print(f"  [Eval] {candidate.get('name', 'unknown')}: no GitHub or resume provided, skipping LLM")
+                return _fallback_evaluation(
+                    overall_rating=1.5,
+                    overall_score=30,
+                    decision="REJECT",
+                    reasoning="No GitHub profile or resume was provided.",
+                )
+        else:
+            print(f"  [Eval] {candidate.get('name', 'unknown')}: GitHub/resume could not be read, skipping LLM")
+            return _fallback_evaluation()
+
+    context = {
+        "candidate": {
+            "name": candidate.get("name", ""),
+            "email": candidate.get("email", ""),
+            "current_ctc": candidate.get("current_ctc", ""),
+            "linkedin": candidate.get("linkedin", ""),
+        },
+        "role": {
+            "name": role.get("name", ""),
+            "jd": role.get("jd", ""),
+            "ctc": role.get("ctc", ""),
+        },
+        "github": github_data or "No GitHub data available",
+        "resume": resume_data or "No resume data available",
+    }
+
+    # Compact separators: indentation only costs input tokens
+    data = orjson.dumps(context, default=str, option=orjson.OPT_NON_STR_KEYS).decode()
+
+    user_prompt = EVAL_USER_PROMPT.format_map({
+        "schema": EVAL_SCHEMA,
+        "data": data,
+    })
+
+    try:
+        print(f"  [Eval] Generating assessment for {candidate.get('name', 'unknown')}...")
+        result_text = _gemini_text(EVAL_SYSTEM_PROMPT, user_prompt, max_tokens=4096, json_mode=True)
+
+        if result_text:
+            parsed = _parse_json(result_text)
+            if parsed and isinstance(parsed, dict):
+                score = parsed.get("overall_score", 50)
+                decision = parsed.get("recommendation", {}).get("decision", "CONSIDER")
+                print(f"  [Eval] {candidate.get('name', 'unknown')}: "
+                      f"score={score}, decision={decision}")
+                return parsed
+
+    except TransientAnalysisError:
+        raise
+    except Exception as e:
+        print(f"  [Eval] Error evaluating {candidate.get('name', 'unknown')}: {e}")
+
+    return _fallback_evaluation()
+
+
 # ─── Full Pipeline ────────────────────────────────────────────────────────────
 
-def analyze_dev_candidate(candidate: Dict, role: Dict) -> Dict:
+def analyze_dev_candidate(candidate: Dict, role: Dict,
+                          github_prefetch: Optional[Dict[str, Optional[Dict]]] = None) -> Dict:
     """
     Run the full analysis pipeline for a developer candidate:
-    1. GitHub GraphQL analysis
-    2. Resume PDF parsing
+    1. GitHub GraphQL analysis   } fetched concurrently
+    2. Resume PDF parsing        }
     3. LLM evaluation
+
+    `github_prefetch` holds profiles already fetched by analyze_github_batch;
+    the candidate's GitHub data is taken from it when present.
+
+    Raises TransientAnalysisError if any step failed in a retryable way, so no
+    placeholder result is returned for a rate-limited or unavailable service.
     """
     name = candidate.get("name", "unknown")
     print(f"\n  [DevAnalyzer] ── Analyzing {name} ──")
-
-    # 1. GitHub
-    github_data = analyze_github(candidate.get("github_username", ""))
-    time.sleep(1)
-
-    # 2. Resume
-    resume_data = parse_resume(candidate.get("resume_url", ""), name)
-    time.sleep(1)
+    username = candidate.get("github_username", "")
+
+    # 1 + 2. GitHub and resume are independent network round-trips
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        if github_prefetch is not None and username in github_prefetch:
+            github_future = None
+            github_data = github_prefetch[username]
+        else:
+            github_future = pool.submit(analyze_github, username)
+        resume_future = pool.submit(parse_resume, candidate.get("resume_url", ""), name)
+        if github_future is not None:
+            github_data = github_future.result()
+        resume_data = resume_future.result()
 
     # 3. LLM evaluation
     evaluation = evaluate_candidate(candidate, role, github_data, resume_data)
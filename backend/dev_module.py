@@ -6,20 +6,31 @@ Google Sheets polling, and candidate lifecycle.
 """
 
 import os
+import re
 import csv
+import hashlib
 import io
-import json
 import time
+import orjson
+import queue
+import random
 import uuid
 import threading
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from typing import Dict, List, Optional
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
 
-from fastapi import APIRouter, Request
+from fastapi import APIRouter, HTTPException, Request
 from pydantic import BaseModel
 
-from dev_analyzer import analyze_dev_candidate
+from dev_analyzer import (
+    DEV_MAX_WORKERS, GITHUB_BATCH_SIZE, TransientAnalysisError, analyze_dev_candidate, analyze_github_batch,
+)
 
 from dotenv import load_dotenv
 load_dotenv()
@@ -28,7 +39,37 @@ load_dotenv()
 
 GOOGLE_SHEET_URL = os.getenv("GOOGLE_SHEET_URL", "")
 DATA_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "devs_data.json")
+JOURNAL_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "devs_data.log")
 SHEET_POLL_INTERVAL = 300  # 5 minutes
+SHEET_POLL_MAX_INTERVAL = 1800  # polls back off to this while sheets are quiet
+SHEET_POLL_WORKERS = 8  # distinct sheets fetched concurrently per cycle
+SHEET_SEEN_IDS_MAX = 50000  # imported sheet IDs remembered (oldest evicted first)
+
+# Keep-alive session for sheet CSV exports, so each poll reuses the connection to
+# docs.google.com; rate limits and transient server errors are retried with backoff
+sheets_session = requests.Session()
+sheets_session.mount("https://", HTTPAdapter(
+    pool_connections=8,
+    pool_maxsize=16,
+    max_retries=Retry(total=3, backoff_factor=0.5, status_forcelist=[429, 500, 502, 503, 504],
+                      raise_on_status=False),
+))
+
+# Background analyses share one bounded pool (DEV_ANALYZER_WORKERS) so a burst of
+# webhooks or a large sheet import queues up instead of spawning a thread each
+analysis_pool = ThreadPoolExecutor(max_workers=max(DEV_MAX_WORKERS, 1), thread_name_prefix="dev-analysis")
+
+# Failed analyses are retried in place with backoff, then parked on a bounded
+# queue that a retry thread drains every ANALYSIS_RETRY_DELAY seconds
+ANALYSIS_ATTEMPTS = 3
+ANALYSIS_RETRY_ROUNDS = 3
+ANALYSIS_RETRY_DELAY = 120
+analysis_retry_queue: "queue.Queue[Tuple[float, str, str, int]]" = queue.Queue(maxsize=500)
+
+# Changes are appended to JOURNAL_FILE as they happen; a compactor folds the
+# journal into a fresh DATA_FILE snapshot hourly, or sooner once it grows large
+JOURNAL_COMPACT_INTERVAL = 3600
+JOURNAL_COMPACT_BYTES = 8 << 20
 
 # ─── Router ───────────────────────────────────────────────────────────────────
 
@@ -36,31 +77,216 @@ router = APIRouter(prefix="/api/devs", tags=["devs"])
 
 # ─── In-Memory Store ──────────────────────────────────────────────────────────
 
-store: Dict = {"roles": {}, "sheet_last_ids": set()}
+store: Dict = {
+    "roles": {},
+    "sheet_last_ids": OrderedDict(),  # sub_id → None, insertion-ordered, capped at SHEET_SEEN_IDS_MAX
+    # Derived lookups, rebuilt by _rebuild_indexes() (not persisted):
+    "form_index": {},   # tally_form_id → first role using it ("" → first role without one)
+    "sheet_index": {},  # sheet_url → role_ids importing from it
+    "candidate_index": {},  # candidate id → role_ids holding it
+}
 
+# Guards every read-modify-write of `store` across the event loop, the sheets
+# poller and analysis workers. Hold it only around dict updates and snapshots,
+# never around network calls or LLM analysis.
+store_lock = threading.RLock()
 
-def _save():
-    """Persist store to JSON file."""
-    data = {
-        "roles": store["roles"],
-        "sheet_last_ids": list(store["sheet_last_ids"]),
-    }
-    with open(DATA_FILE, "w", encoding="utf-8") as f:
-        json.dump(data, f, indent=2, default=str)
+_journal_lock = threading.Lock()
+_journal_file = None  # append handle, opened on first write
+_compact_lock = threading.Lock()
+_compact_now = threading.Event()
 
 
-def _load():
-    """Load store from JSON file if it exists."""
-    global store
-    if os.path.exists(DATA_FILE):
+def _journal(*records: Dict):
+    """
+    Append change records to the journal. Callers hold store_lock, so records
+    land in the same order as the changes they describe.
+    """
+    global _journal_file
+    lines = b"".join(orjson.dumps(r, default=str, option=orjson.OPT_NON_STR_KEYS) + b"\n" for r in records)
+    try:
+        with _journal_lock:
+            if _journal_file is None:
+                _journal_file = open(JOURNAL_FILE, "ab")
+            _journal_file.write(lines)
+            _journal_file.flush()
+            size = _journal_file.tell()
+    except OSError as e:
+        print(f"[DevModule] Error saving data: {e}")
+        return
+    if size > JOURNAL_COMPACT_BYTES:
+        _compact_now.set()
+
+
+def _save_role(role_id: str):
+    """Journal a role's own fields (candidates are journaled one by one)."""
+    with store_lock:
+        role = store["roles"][role_id]
+        _journal({"op": "role", "id": role_id, "role": {k: v for k, v in role.items() if k != "candidates"}})
+
+
+def _save_role_deleted(role_id: str):
+    with store_lock:
+        _journal({"op": "delete_role", "id": role_id})
+
+
+def _save_candidates(role_id: str, candidate_ids: List[str]):
+    """Journal the current state of the given candidates."""
+    with store_lock:
+        candidates = store["roles"][role_id]["candidates"]
+        _journal(*({"op": "candidate", "role_id": role_id, "id": cid, "candidate": candidates[cid]}
+                   for cid in candidate_ids))
+
+
+def _apply_record(record: Dict):
+    """Replay one journal record onto the store (records are full upserts, so replay is idempotent)."""
+    op = record.get("op")
+    roles = store["roles"]
+    if op == "role":
+        role = record["role"]
+        role["candidates"] = roles.get(record["id"], {}).get("candidates", {})
+        roles[record["id"]] = role
+    elif op == "delete_role":
+        roles.pop(record["id"], None)
+    elif op == "candidate":
+        role = roles.get(record["role_id"])
+        if role is not None:
+            role["candidates"][record["id"]] = record["candidate"]
+    elif op == "sheet_ids":
+        for sub_id in record.get("add", []):
+            _remember_sheet_id(sub_id)
+        for sub_id in record.get("drop", []):
+            store["sheet_last_ids"].pop(sub_id, None)
+
+
+def _compact():
+    """
+    Write a full snapshot to DATA_FILE and drop the journal records it covers.
+    Records appended while the snapshot is being written are kept.
+    """
+    global _journal_file
+    with _compact_lock:
+        # Serializing under the store lock is the snapshot: one fast C call,
+        # cheaper than deep-copying the store first
+        with store_lock:
+            with _journal_lock:
+                offset = os.path.getsize(JOURNAL_FILE) if os.path.exists(JOURNAL_FILE) else 0
+            if not offset and os.path.exists(DATA_FILE):
+                return
+            data = orjson.dumps({
+                "roles": store["roles"],
+                "sheet_last_ids": list(store["sheet_last_ids"]),
+            }, default=str, option=orjson.OPT_NON_STR_KEYS)
+        tmp_path = f"{DATA_FILE}.tmp"
+        with open(tmp_path, "wb", buffering=1 << 18) as f:
+            f.write(data)
+        os.replace(tmp_path, DATA_FILE)
+
+        if not offset:
+            return
+        with _journal_lock:
+            with open(JOURNAL_FILE, "rb") as f:
+                f.seek(offset)
+                tail = f.read()
+            with open(f"{JOURNAL_FILE}.tmp", "wb") as f:
+                f.write(tail)
+            if _journal_file is not None:
+                _journal_file.close()
+                _journal_file = None
+            os.replace(f"{JOURNAL_FILE}.tmp", JOURNAL_FILE)
+
+
+def _compactor_loop():
+    while True:
+        _compact_now.wait(JOURNAL_COMPACT_INTERVAL)
+        _compact_now.clear()
         try:
-            with open(DATA_FILE, "r", encoding="utf-8") as f:
-                data = json.load(f)
-            store["roles"] = data.get("roles", {})
-            store["sheet_last_ids"] = set(data.get("sheet_last_ids", []))
-            print(f"[DevModule] Loaded {len(store['roles'])} roles from {DATA_FILE}")
+            _compact()
         except Exception as e:
-            print(f"[DevModule] Error loading data: {e}")
+            print(f"[DevModule] Error compacting data: {e}")
+
+
+def shutdown_analysis():
+    """
+    Drop queued analyses and wait only for the ones already running, then fold
+    the journal into the snapshot. Called from the app's shutdown hook: the
+    pool's worker threads aren't daemons, so waiting for interpreter exit would
+    run the whole queue first. Dropped candidates keep no evaluation and are
+    picked up again by the next /analyze. The final compaction is best-effort;
+    the journal is replayed on the next start either way.
+    """
+    analysis_pool.shutdown(wait=True, cancel_futures=True)
+    try:
+        _compact()
+    except Exception as e:
+        print(f"[DevModule] Error compacting data: {e}")
+
+
+threading.Thread(target=_compactor_loop, daemon=True, name="dev-compactor").start()
+
+
+def _load():
+    """Load the store snapshot, then replay any journal records written after it."""
+    global store
+    replayed = 0
+    try:
+        with store_lock:
+            if os.path.exists(DATA_FILE):
+                with open(DATA_FILE, "rb") as f:
+                    data = orjson.loads(f.read())
+                store["roles"] = data.get("roles", {})
+                store["sheet_last_ids"] = OrderedDict.fromkeys(data.get("sheet_last_ids", [])[-SHEET_SEEN_IDS_MAX:])
+            if os.path.exists(JOURNAL_FILE):
+                with open(JOURNAL_FILE, "rb") as f:
+                    for line in f:
+                        try:
+                            record = orjson.loads(line)
+                        except orjson.JSONDecodeError:
+                            continue  # torn final line from a crash mid-write
+                        _apply_record(record)
+                        replayed += 1
+            for role in store["roles"].values():
+                role["selected_count"] = sum(
+                    1 for c in role.get("candidates", {}).values() if c.get("status") == "selected"
+                )
+            _rebuild_indexes()
+        print(f"[DevModule] Loaded {len(store['roles'])} roles from {DATA_FILE}"
+              + (f" (+{replayed} journal records)" if replayed else ""))
+    except Exception as e:
+        print(f"[DevModule] Error loading data: {e}")
+        return
+    if replayed:
+        _compact()
+
+
+def _rebuild_indexes():
+    """Recompute the derived indexes after roles are loaded, added or removed (caller holds store_lock)."""
+    form_index, sheet_index, candidate_index = {}, {}, {}
+    for role_id, role in store["roles"].items():
+        form_index.setdefault(role.get("tally_form_id", ""), role_id)
+        if role.get("sheet_url"):
+            sheet_index.setdefault(role["sheet_url"], []).append(role_id)
+        for cid in role.get("candidates", {}):
+            candidate_index.setdefault(cid, []).append(role_id)
+    store["form_index"], store["sheet_index"] = form_index, sheet_index
+    store["candidate_index"] = candidate_index
+
+
+def _index_candidate(role_id: str, candidate_id: str):
+    """Record a newly added candidate in candidate_index (caller holds store_lock)."""
+    store["candidate_index"].setdefault(candidate_id, []).append(role_id)
+
+
+def _set_status(role: Dict, candidate: Dict, status: str):
+    """Change a candidate's status, keeping the role's selected_count in step (caller holds store_lock)."""
+    old = candidate.get("status")
+    if old == status:
+        return
+    if old == "selected":
+        role["selected_count"] -= 1
+    if status == "selected":
+        role["selected_count"] += 1
+    candidate["status"] = status
 
 
 # ─── Models ───────────────────────────────────────────────────────────────────
@@ -87,54 +313,55 @@ class AssessmentStatusUpdate(BaseModel):
 
 @router.get("/roles")
 async def list_roles():
-    roles = []
-    for role_id, role in store["roles"].items():
-        candidates = role.get("candidates", {})
-        selected = sum(1 for c in candidates.values()
-                       if c.get("status") == "selected")
-        roles.append({
-            "id": role_id,
-            "name": role["name"],
-            "jd": role["jd"],
-            "ctc": role["ctc"],
-            "positions": role["positions"],
-            "tally_link": role.get("tally_link", ""),
-            "tally_form_id": role.get("tally_form_id", ""),
-            "sheet_url": role.get("sheet_url", ""),
-            "total_candidates": len(candidates),
-            "selected_count": selected,
-        })
+    with store_lock:
+        roles = []
+        for role_id, role in store["roles"].items():
+            roles.append({
+                "id": role_id,
+                "name": role["name"],
+                "jd": role["jd"],
+                "ctc": role["ctc"],
+                "positions": role["positions"],
+                "tally_link": role.get("tally_link", ""),
+                "tally_form_id": role.get("tally_form_id", ""),
+                "sheet_url": role.get("sheet_url", ""),
+                "total_candidates": len(role["candidates"]),
+                "selected_count": role["selected_count"],
+            })
     return {"roles": roles}
 
 
 @router.post("/roles")
 async def create_role(req: RoleCreate):
     role_id = str(uuid.uuid4())[:8]
-    store["roles"][role_id] = {
-        "name": req.name,
-        "jd": req.jd,
-        "ctc": req.ctc,
-        "positions": req.positions,
-        "tally_link": req.tally_link,
-        "tally_form_id": req.tally_form_id,
-        "sheet_url": req.sheet_url,
-        "candidates": {},
-        "created_at": datetime.now().isoformat(),
-    }
-    _save()
+    with store_lock:
+        store["roles"][role_id] = {
+            "name": req.name,
+            "jd": req.jd,
+            "ctc": req.ctc,
+            "positions": req.positions,
+            "tally_link": req.tally_link,
+            "tally_form_id": req.tally_form_id,
+            "sheet_url": req.sheet_url,
+            "candidates": {},
+            "selected_count": 0,
+            "created_at": datetime.now().isoformat(),
+        }
+        _rebuild_indexes()
+        _save_role(role_id)
     print(f"[DevModule] Created role: {req.name} ({role_id})")
     return {"id": role_id, "message": f"Role '{req.name}' created"}
 
 
 @router.get("/roles/{role_id}")
 async def get_role(role_id: str):
-    role = store["roles"].get(role_id)
-    if not role:
-        return {"error": "Role not found"}, 404
+    with store_lock:
+        role = store["roles"].get(role_id)
+        if not role:
+            raise HTTPException(status_code=404, detail="Role not found")
 
-    candidates_list = []
-    for cid, c in role.get("candidates", {}).items():
-        candidates_list.append({**c, "id": cid})
+        candidates_list = [{**c, "id": cid} for cid, c in role["candidates"].items()]
+        role = dict(role)  # scalar fields are read below, after the lock is released
 
     # Sort by score descending (evaluation can be None while analysis is pending)
     candidates_list.sort(
@@ -142,8 +369,6 @@ async def get_role(role_id: str):
         reverse=True
     )
 
-    selected_count = sum(1 for c in candidates_list if c.get("status") == "selected")
-
     return {
         "id": role_id,
         "name": role["name"],
@@ -153,45 +378,45 @@ async def get_role(role_id: str):
         "tally_link": role.get("tally_link", ""),
         "tally_form_id": role.get("tally_form_id", ""),
         "sheet_url": role.get("sheet_url", ""),
-        "selected_count": selected_count,
+        "selected_count": role["selected_count"],
         "candidates": candidates_list,
     }
 
 
 @router.delete("/roles/{role_id}")
 async def delete_role(role_id: str):
-    if role_id in store["roles"]:
-        name = store["roles"][role_id]["name"]
-        del store["roles"][role_id]
-        _save()
-        return {"message": f"Role '{name}' deleted"}
-    return {"error": "Role not found"}
+    with store_lock:
+        if role_id in store["roles"]:
+            name = store["roles"][role_id]["name"]
+            del store["roles"][role_id]
+            _rebuild_indexes()
+            _save_role_deleted(role_id)
+            return {"message": f"Role '{name}' deleted"}
+    raise HTTPException(status_code=404, detail="Role not found")
 
 
 # ─── Candidate Status ────────────────────────────────────────────────────────
 
 @router.put("/roles/{role_id}/candidates/{candidate_id}/status")
 async def update_candidate_status(role_id: str, candidate_id: str, req: StatusUpdate):
-    role = store["roles"].get(role_id)
-    if not role:
-        return {"error": "Role not found"}
-
-    candidate = role["candidates"].get(candidate_id)
-    if not candidate:
-        return {"error": "Candidate not found"}
-
-    # Check slot limit for selection
-    if req.status == "selected":
-        selected_count = sum(
-            1 for cid, c in role["candidates"].items()
-            if c.get("status") == "selected" and cid != candidate_id
-        )
-        if selected_count >= role["positions"]:
-            return {"error": f"All {role['positions']} positions are filled. Cannot select more."}
-
-    old_status = candidate.get("status", "waitlisted")
-    candidate["status"] = req.status
-    _save()
+    with store_lock:
+        role = store["roles"].get(role_id)
+        if not role:
+            raise HTTPException(status_code=404, detail="Role not found")
+
+        candidate = role["candidates"].get(candidate_id)
+        if not candidate:
+            raise HTTPException(status_code=404, detail="Candidate not found")
+
+        # Check slot limit for selection
+        if req.status == "selected" and candidate.get("status") != "selected":
+            if role["selected_count"] >= role["positions"]:
+                raise HTTPException(status_code=409,
+                                    detail=f"All {role['positions']} positions are filled. Cannot select more.")
+
+        old_status = candidate.get("status", "waitlisted")
+        _set_status(role, candidate, req.status)
+        _save_candidates(role_id, [candidate_id])
     print(f"[DevModule] {candidate.get('name', candidate_id)}: {old_status} → {req.status}")
     return {"message": f"Status updated to {req.status}", "status": req.status}
 
@@ -201,19 +426,21 @@ async def update_assessment_status(role_id: str, candidate_id: str, req: Assessm
     """Update the assessment pipeline stage for a candidate."""
     VALID = {"assessment_sent", "in_review", "failed"}
     if req.assessment_status not in VALID:
-        return {"error": f"Invalid assessment_status. Must be one of: {', '.join(sorted(VALID))}"}
+        raise HTTPException(status_code=400,
+                            detail=f"Invalid assessment_status. Must be one of: {', '.join(sorted(VALID))}")
 
-    role = store["roles"].get(role_id)
-    if not role:
-        return {"error": "Role not found"}
+    with store_lock:
+        role = store["roles"].get(role_id)
+        if not role:
+            raise HTTPException(status_code=404, detail="Role not found")
 
-    candidate = role["candidates"].get(candidate_id)
-    if not candidate:
-        return {"error": "Candidate not found"}
+        candidate = role["candidates"].get(candidate_id)
+        if not candidate:
+            raise HTTPException(status_code=404, detail="Candidate not found")
 
-    old = candidate.get("assessment_status", "assessment_sent")
-    candidate["assessment_status"] = req.assessment_status
-    _save()
+        old = candidate.get("assessment_status", "assessment_sent")
+        candidate["assessment_status"] = req.assessment_status
+        _save_candidates(role_id, [candidate_id])
     print(f"[DevModule] {candidate.get('name', candidate_id)}: assessment {old} → {req.assessment_status}")
     return {"message": f"Assessment status updated to {req.assessment_status}", "assessment_status": req.assessment_status}
 
@@ -224,9 +451,9 @@ async def update_assessment_status(role_id: str, candidate_id: str, req: Assessm
 async def tally_webhook(request: Request):
     """Receive Tally form submission webhook."""
     try:
-        payload = await request.json()
+        payload = orjson.loads(await request.body())
     except Exception:
-        return {"error": "Invalid JSON"}
+        raise HTTPException(status_code=400, detail="Invalid JSON")
 
     data = payload.get("data", {})
     form_id = data.get("formId", "")
@@ -239,61 +466,73 @@ async def tally_webhook(request: Request):
     # Parse fields
     candidate = _parse_tally_fields(fields, submission_id)
 
-    # Find matching role by formId
-    matched_role_id = None
-    for role_id, role in store["roles"].items():
-        if role.get("tally_form_id") == form_id:
-            matched_role_id = role_id
-            break
-
-    if not matched_role_id:
-        # No matching role — try to find a role that has no form_id set (default)
-        for role_id, role in store["roles"].items():
-            if not role.get("tally_form_id"):
-                matched_role_id = role_id
-                break
-
-    if not matched_role_id:
-        # Still no match — add to first role if any
-        if store["roles"]:
-            matched_role_id = list(store["roles"].keys())[0]
-        else:
-            print(f"[Webhook] No roles exist. Creating default role.")
-            matched_role_id = str(uuid.uuid4())[:8]
-            store["roles"][matched_role_id] = {
-                "name": data.get("formName", "Default Role"),
-                "jd": "",
-                "ctc": "",
-                "positions": 10,
-                "tally_link": "",
-                "tally_form_id": form_id,
-                "sheet_url": "",
-                "candidates": {},
-                "created_at": datetime.now().isoformat(),
-            }
-
-    # Check for duplicates
-    role = store["roles"][matched_role_id]
-    if submission_id in role["candidates"]:
-        print(f"[Webhook] Duplicate submission {submission_id}, skipping")
-        return {"status": "duplicate"}
-
-    # Add candidate
-    role["candidates"][submission_id] = candidate
-    _save()
+    with store_lock:
+        # Find matching role by formId, else a role that has no form_id set (default)
+        matched_role_id = store["form_index"].get(form_id) or store["form_index"].get("")
+
+        if not matched_role_id:
+            # Still no match — add to first role if any
+            if store["roles"]:
+                matched_role_id = list(store["roles"].keys())[0]
+            else:
+                print(f"[Webhook] No roles exist. Creating default role.")
+                matched_role_id = str(uuid.uuid4())[:8]
+                store["roles"][matched_role_id] = {
+                    "name": data.get("formName", "Default Role"),
+                    "jd": "",
+                    "ctc": "",
+                    "positions": 10,
+                    "tally_link": "",
+                    "tally_form_id": form_id,
+                    "sheet_url": "",
+                    "candidates": {},
+                    "selected_count": 0,
+                    "created_at": datetime.now().isoformat(),
+                }
+                _rebuild_indexes()
+                _save_role(matched_role_id)
+
+        # Check for duplicates
+        role = store["roles"][matched_role_id]
+        if submission_id in role["candidates"]:
+            print(f"[Webhook] Duplicate submission {submission_id}, skipping")
+            return {"status": "duplicate"}
+
+        # Add candidate
+        role["candidates"][submission_id] = candidate
+        _index_candidate(matched_role_id, submission_id)
+        _save_candidates(matched_role_id, [submission_id])
 
     print(f"[Webhook] Added {candidate['name']} to role '{role['name']}'")
 
     # Trigger async analysis
-    threading.Thread(
-        target=_analyze_candidate_async,
-        args=(matched_role_id, submission_id),
-        daemon=True
-    ).start()
+    analysis_pool.submit(_analyze_candidate_async, matched_role_id, submission_id)
 
     return {"status": "received", "candidate": candidate["name"], "role": role["name"]}
 
 
+# Candidate field for a Tally question label, first match wins (labels are lowercased)
+_TALLY_FIELD_RULES = [
+    (re.compile(r"^(?!.*user).*name", re.S), "name"),
+    (re.compile(r"number|phone"), "phone"),
+    (re.compile(r"email"), "email"),
+    (re.compile(r"resume"), "resume_url"),  # also any FILE_UPLOAD field
+    (re.compile(r"github"), "github_username"),
+    (re.compile(r"linkedin"), "linkedin"),
+    (re.compile(r"ctc|salary"), "current_ctc"),
+]
+
+
+@lru_cache(maxsize=256)
+def _tally_field_key(label: str, field_type: str) -> Optional[str]:
+    """Map a Tally field to a candidate key; cached since every submission repeats the same labels."""
+    label = label.lower()
+    for pattern, key in _TALLY_FIELD_RULES:
+        if pattern.search(label) or (key == "resume_url" and field_type == "FILE_UPLOAD"):
+            return key
+    return None
+
+
 def _parse_tally_fields(fields: List[Dict], submission_id: str = "") -> Dict:
     """Parse Tally form fields into a candidate dict."""
     candidate = {
@@ -313,68 +552,134 @@ def _parse_tally_fields(fields: List[Dict], submission_id: str = "") -> Dict:
     }
 
     for field in fields:
-        label = field.get("label", "").lower()
+        key = _tally_field_key(field.get("label", ""), field.get("type", ""))
+        if not key:
+            continue
         value = field.get("value", "")
-        field_type = field.get("type", "")
-
-        if "name" in label and "user" not in label:
-            candidate["name"] = value
-        elif "number" in label or "phone" in label:
-            candidate["phone"] = value
-        elif "email" in label:
-            candidate["email"] = value
-        elif "resume" in label or field_type == "FILE_UPLOAD":
+
+        if key == "resume_url":
             if isinstance(value, list) and len(value) > 0:
                 candidate["resume_url"] = value[0].get("url", "")
             elif isinstance(value, str):
                 candidate["resume_url"] = value
-        elif "github" in label:
-            candidate["github_username"] = value
-        elif "linkedin" in label:
-            candidate["linkedin"] = value
-        elif "ctc" in label or "salary" in label:
-            candidate["current_ctc"] = value
+        else:
+            candidate[key] = value
 
     return candidate
 
 
-def _analyze_candidate_async(role_id: str, candidate_id: str):
-    """Run analysis in background thread."""
+def _analyze_with_retries(candidate: Dict, role: Dict,
+                          github_prefetch: Optional[Dict[str, Optional[Dict]]] = None) -> Dict:
+    """
+    Call analyze_dev_candidate, backing off (1s, 2s... plus jitter) after
+    transient failures (rate limits, outages, empty model replies).
+    """
+    for attempt in range(ANALYSIS_ATTEMPTS):
+        try:
+            return analyze_dev_candidate(candidate, role, github_prefetch)
+        except TransientAnalysisError as e:
+            if attempt == ANALYSIS_ATTEMPTS - 1:
+                raise
+            delay = min(60, 2 ** attempt) + random.random()
+            print(f"  [DevModule] Analysis attempt {attempt + 1} failed ({e}), retrying in {delay:.1f}s")
+            time.sleep(delay)
+
+
+def _schedule_retry(role_id: str, candidate_id: str, retry_round: int):
+    """Park a failed analysis for the retry thread, unless it has used up its rounds or the queue is full."""
+    if retry_round >= ANALYSIS_RETRY_ROUNDS:
+        print(f"  [DevModule] Giving up on {candidate_id} after {retry_round} retry rounds")
+        return
     try:
-        role = store["roles"].get(role_id)
-        if not role:
-            return
-        candidate = role["candidates"].get(candidate_id)
-        if not candidate:
+        analysis_retry_queue.put_nowait((time.time() + ANALYSIS_RETRY_DELAY, role_id, candidate_id, retry_round + 1))
+        print(f"  [DevModule] Queued {candidate_id} for retry in {ANALYSIS_RETRY_DELAY}s")
+    except queue.Full:
+        print(f"  [DevModule] Retry queue full, dropping {candidate_id} (re-run via /analyze)")
+
+
+def _retry_loop():
+    while True:
+        due, role_id, candidate_id, retry_round = analysis_retry_queue.get()
+        time.sleep(max(0.0, due - time.time()))
+        try:
+            analysis_pool.submit(_analyze_candidate_async, role_id, candidate_id, retry_round)
+        except RuntimeError:
+            return  # pool shut down at exit
+
+
+threading.Thread(target=_retry_loop, daemon=True, name="dev-analysis-retry").start()
+
+
+def _analyze_candidates(jobs: List[Tuple[str, str]]):
+    """
+    Queue analyses for (role_id, candidate_id) pairs. Each group of
+    GITHUB_BATCH_SIZE candidates gets one pool job that fetches their GitHub
+    profiles in a single aliased GraphQL request before queueing the analyses.
+    """
+    for start in range(0, len(jobs), GITHUB_BATCH_SIZE):
+        analysis_pool.submit(_prefetch_and_analyze, jobs[start:start + GITHUB_BATCH_SIZE])
+
+
+def _prefetch_and_analyze(jobs: List[Tuple[str, str]]):
+    with store_lock:
+        usernames = [
+            store["roles"].get(role_id, {}).get("candidates", {}).get(cid, {}).get("github_username", "")
+            for role_id, cid in jobs
+        ]
+    github_prefetch = analyze_github_batch(usernames)
+    try:
+        for role_id, cid in jobs:
+            analysis_pool.submit(_analyze_candidate_async, role_id, cid, 0, github_prefetch)
+    except RuntimeError:
+        pass  # pool shut down at exit
+
+
+def _analyze_candidate_async(role_id: str, candidate_id: str, retry_round: int = 0,
+                             github_prefetch: Optional[Dict[str, Optional[Dict]]] = None):
+    """Run analysis in background thread (`github_prefetch` as in analyze_dev_candidate)."""
+    try:
+        with store_lock:
+            role = store["roles"].get(role_id)
+            if not role:
+                return
+            candidate = role["candidates"].get(candidate_id)
+            if not candidate:
+                return
+            # Snapshots: the analysis runs for a while without the lock
+            candidate_snapshot, role_snapshot = dict(candidate), dict(role)
+
+        try:
+            result = _analyze_with_retries(candidate_snapshot, role_snapshot, github_prefetch)
+        except TransientAnalysisError as e:
+            # Nothing is saved: the candidate keeps its previous results until a retry succeeds
+            print(f"  [DevModule] Analysis failed for {candidate_id}: {e}")
+            _schedule_retry(role_id, candidate_id, retry_round)
             return
 
-        result = analyze_dev_candidate(candidate, role)
-
-        # Update candidate with results — only overwrite if new data is present,
-        # so we don't lose existing data when re-analyzing for a single missing piece
-        if result.get("github_analysis") is not None:
-            candidate["github_analysis"] = result["github_analysis"]
-        if result.get("resume_analysis") is not None:
-            candidate["resume_analysis"] = result["resume_analysis"]
-        if result.get("evaluation") is not None:
-            candidate["evaluation"] = result["evaluation"]
-
-        # Set initial status based on score
-        score = (result.get("evaluation") or {}).get("overall_score", 50)
-        if score >= 71:
-            candidate["status"] = "selected"
-            # But check slot limit
-            selected = sum(1 for c in role["candidates"].values()
-                           if c.get("status") == "selected"
-                           and c.get("submission_id") != candidate_id)
-            if selected >= role["positions"]:
-                candidate["status"] = "waitlisted"
-        elif score <= 40:
-            candidate["status"] = "rejected"
-        else:
-            candidate["status"] = "waitlisted"
+        with store_lock:
+            if store["roles"].get(role_id) is not role:
+                return  # role was deleted while the analysis ran
+            # Update candidate with results — only overwrite if new data is present,
+            # so we don't lose existing data when re-analyzing for a single missing piece
+            if result.get("github_analysis") is not None:
+                candidate["github_analysis"] = result["github_analysis"]
+            if result.get("resume_analysis") is not None:
+                candidate["resume_analysis"] = result["resume_analysis"]
+            if result.get("evaluation") is not None:
+                candidate["evaluation"] = result["evaluation"]
+
+            # Set initial status based on score
+            score = (result.get("evaluation") or {}).get("overall_score", 50)
+            if score >= 71:
+                # Select, unless every slot is taken by someone else
+                others_selected = role["selected_count"] - (candidate.get("status") == "selected")
+                _set_status(role, candidate, "selected" if others_selected < role["positions"] else "waitlisted")
+            elif score <= 40:
+                _set_status(role, candidate, "rejected")
+            else:
+                _set_status(role, candidate, "waitlisted")
+            _save_candidates(role_id, [candidate_id])
 
-        _save()
         print(f"  [DevModule] Analysis complete for {candidate['name']}: "
               f"score={score}, status={candidate['status']}")
 
@@ -384,16 +689,19 @@ def _analyze_candidate_async(role_id: str, candidate_id: str):
 
 # ─── Google Sheets Poller ─────────────────────────────────────────────────────
 
+_SHEET_ID_RE = re.compile(r'https://docs\.google\.com/spreadsheets/d/([^/]+)')
+
+
+@lru_cache(maxsize=256)
 def _convert_sheet_url(url):
-    """Convert Google Sheets edit URL to CSV export URL."""
+    """Convert Google Sheets edit URL to CSV export URL (memoized; polls convert the same URLs every cycle)."""
     if not url:
         return url
     # Already a CSV export URL
     if "export?format=csv" in url or "pub?output=csv" in url:
         return url
     # Convert /edit... to /export?format=csv
-    import re as _re
-    match = _re.match(r'https://docs\.google\.com/spreadsheets/d/([^/]+)', url)
+    match = _SHEET_ID_RE.match(url)
     if match:
         sheet_id = match.group(1)
         csv_url = f"https://docs.google.com/spreadsheets/d/{sheet_id}/export?format=csv"
@@ -404,29 +712,119 @@ def _convert_sheet_url(url):
 
 def _clean_stale_sheet_ids():
     """Remove IDs from sheet_last_ids that don't exist in any role's candidates."""
-    all_candidate_ids = set()
-    for role in store["roles"].values():
-        all_candidate_ids.update(role.get("candidates", {}).keys())
-
-    stale = store["sheet_last_ids"] - all_candidate_ids
-    if stale:
-        print(f"[Sheets] Clearing {len(stale)} stale sheet IDs: {stale}")
-        store["sheet_last_ids"] -= stale
-        _save()
-
-
-def _fuzzy_get(row, *possible_keys, default=""):
-    """Get value from row by trying multiple possible column header names (case-insensitive)."""
-    row_lower = {k.strip().lower(): v for k, v in row.items()}
-    for key in possible_keys:
-        val = row_lower.get(key.strip().lower(), "")
+    with store_lock:
+        seen, candidate_index = store["sheet_last_ids"], store["candidate_index"]
+        stale = [sub_id for sub_id in seen if sub_id not in candidate_index]
+        if stale:
+            print(f"[Sheets] Clearing {len(stale)} stale sheet IDs: {stale}")
+            for sub_id in stale:
+                del seen[sub_id]
+            _journal({"op": "sheet_ids", "drop": stale})
+
+
+def _remember_sheet_id(sub_id: str):
+    """Record an imported sheet ID, evicting the oldest past SHEET_SEEN_IDS_MAX. Caller holds store_lock."""
+    seen = store["sheet_last_ids"]
+    seen[sub_id] = None
+    seen.move_to_end(sub_id)
+    while len(seen) > SHEET_SEEN_IDS_MAX:
+        seen.popitem(last=False)
+
+
+# Sheet column headers accepted for each candidate field (case-insensitive), in priority order
+_SHEET_COLUMNS = {
+    "submission_id": ("Submission ID", "submission_id", "submissionid", "ID", "id", "Response ID"),
+    "name": ("What is your full name?", "what is your full name", "name", "full name", "Name"),
+    "phone": ("Your number?", "your number", "phone", "phone number", "mobile", "Number"),
+    "email": ("Your email", "your email", "email", "email address", "Email"),
+    "resume_url": ("Updated resume", "updated resume", "resume", "resume url", "Resume"),
+    "github_username": ("Your github username", "your github username", "github", "github username", "GitHub"),
+    "linkedin": ("Your linkedin", "your linkedin", "linkedin", "linkedin url", "LinkedIn"),
+    "current_ctc": ("Current CTC", "current ctc", "ctc", "salary", "CTC"),
+    "submitted_at": ("Submitted at", "submitted_at", "timestamp", "date"),
+}
+
+
+def _resolve_sheet_columns(headers: List[str]) -> Dict[str, Tuple[int, ...]]:
+    """Map each candidate field to the indexes of its matching columns, in priority order (once per import)."""
+    header_index = {h.strip().lower(): i for i, h in enumerate(headers)}
+    columns = {}
+    for field, keys in _SHEET_COLUMNS.items():
+        indexes = []
+        for key in keys:
+            i = header_index.get(key.strip().lower())
+            if i is not None and i not in indexes:
+                indexes.append(i)
+        columns[field] = tuple(indexes)
+    return columns
+
+
+def _row_value(row: List[str], indexes: Tuple[int, ...], default: str = "") -> str:
+    """First non-empty cell among the resolved columns."""
+    for i in indexes:
+        val = row[i] if i < len(row) else ""
         if val:
             return str(val).strip()
     return default
 
 
-def _import_from_sheet(target_role_id, sheet_url, trigger_analysis=True):
-    """Fetch a sheet CSV and add new candidates to the role. Returns count added."""
+def _add_sheet_row(target_role_id: str, sub_id: str, row: List[str],
+                   columns: Dict[str, Tuple[int, ...]]) -> Optional[str]:
+    """Add one sheet row as a candidate of the target role. Returns the role id it was added to, else None."""
+    with store_lock:
+        # Find target role
+        actual_role_id = target_role_id
+        if actual_role_id == "__global__":
+            if store["roles"]:
+                actual_role_id = list(store["roles"].keys())[0]
+            else:
+                print(f"[Sheets] No roles exist, skipping")
+                return None
+
+        role = store["roles"].get(actual_role_id)
+        if not role:
+            return None
+
+        # Skip ONLY if already in THIS role's candidates
+        if sub_id in role["candidates"]:
+            return None
+
+        candidate = {
+            "submission_id": sub_id,
+            "name": _row_value(row, columns["name"]),
+            "phone": _row_value(row, columns["phone"]),
+            "email": _row_value(row, columns["email"]),
+            "resume_url": _row_value(row, columns["resume_url"]),
+            "github_username": _row_value(row, columns["github_username"]),
+            "linkedin": _row_value(row, columns["linkedin"]),
+            "current_ctc": _row_value(row, columns["current_ctc"]),
+            "status": "waitlisted",
+            "submitted_at": _row_value(row, columns["submitted_at"], default=datetime.now().isoformat()),
+            "evaluation": None,
+            "github_analysis": None,
+            "resume_analysis": None,
+        }
+
+        role["candidates"][sub_id] = candidate
+        _index_candidate(actual_role_id, sub_id)
+        _remember_sheet_id(sub_id)
+        _save_candidates(actual_role_id, [sub_id])
+        _journal({"op": "sheet_ids", "add": [sub_id]})
+        print(f"[Sheets] Added candidate: {candidate['name'] or sub_id}")
+    return actual_role_id
+
+
+# (target roles, CSV URL) -> (ETag, Last-Modified) of the last fully imported response
+_sheet_validators: Dict[Tuple[Tuple[str, ...], str], Tuple[str, str]] = {}
+
+
+def _import_from_sheet(target_role_ids, sheet_url, trigger_analysis=True, conditional=False):
+    """
+    Fetch a sheet CSV once and add its new candidates to each of the target
+    roles. Returns count added.
+    With `conditional`, the request carries the validators from the last import
+    and an unchanged sheet (304) is skipped without downloading or parsing it.
+    """
     sheet_url = _convert_sheet_url(sheet_url)
     if not sheet_url:
         return 0
@@ -434,91 +832,18 @@ def _import_from_sheet(target_role_id, sheet_url, trigger_analysis=True):
     # Clean stale IDs first so previously failed imports can be retried
     _clean_stale_sheet_ids()
 
-    try:
-        resp = requests.get(sheet_url, timeout=30)
-        resp.raise_for_status()
-        text = resp.text
-        if not text.strip():
-            print(f"[Sheets] Empty response from sheet")
-            return 0
-
-        reader = csv.DictReader(io.StringIO(text))
-        headers = reader.fieldnames or []
-        print(f"[Sheets] Sheet columns: {headers}")
-
-        new_count = 0
-        for row_idx, row in enumerate(reader):
-            # Try multiple possible column names for submission ID
-            sub_id = _fuzzy_get(
-                row,
-                "Submission ID", "submission_id", "submissionid",
-                "ID", "id", "Response ID"
-            )
-            if not sub_id:
-                # Generate a deterministic ID from name+email if no submission ID column
-                name_val = _fuzzy_get(row, "name", "full name", "what is your full name?", "what is your full name")
-                email_val = _fuzzy_get(row, "email", "your email", "email address")
-                if name_val or email_val:
-                    sub_id = f"sheet_{hash((name_val, email_val)) & 0xFFFFFFFF:08x}"
-                else:
-                    print(f"[Sheets] Row {row_idx}: no ID and no name/email, skipping")
-                    continue
-
-            # Find target role
-            actual_role_id = target_role_id
-            if actual_role_id == "__global__":
-                if store["roles"]:
-                    actual_role_id = list(store["roles"].keys())[0]
-                else:
-                    print(f"[Sheets] No roles exist, skipping")
-                    continue
-
-            role = store["roles"].get(actual_role_id)
-            if not role:
-                continue
-
-            # Skip ONLY if already in THIS role's candidates
-            if sub_id in role["candidates"]:
-                continue
-
-            candidate = {
-                "submission_id": sub_id,
-                "name": _fuzzy_get(row, "What is your full name?", "what is your full name", "name", "full name", "Name"),
-                "phone": _fuzzy_get(row, "Your number?", "your number", "phone", "phone number", "mobile", "Number"),
-                "email": _fuzzy_get(row, "Your email", "your email", "email", "email address", "Email"),
-                "resume_url": _fuzzy_get(row, "Updated resume", "updated resume", "resume", "resume url", "Resume"),
-                "github_username": _fuzzy_get(row, "Your github username", "your github username", "github", "github username", "GitHub"),
-                "linkedin": _fuzzy_get(row, "Your linkedin", "your linkedin", "linkedin", "linkedin url", "LinkedIn"),
-                "current_ctc": _fuzzy_get(row, "Current CTC", "current ctc", "ctc", "salary", "CTC"),
-                "status": "waitlisted",
-                "submitted_at": _fuzzy_get(row, "Submitted at", "submitted_at", "timestamp", "date",
-                                           default=datetime.now().isoformat()),
-                "evaluation": None,
-                "github_analysis": None,
-                "resume_analysis": None,
-            }
-
-            role["candidates"][sub_id] = candidate
-            store["sheet_last_ids"].add(sub_id)
-            new_count += 1
-            print(f"[Sheets] Added candidate: {candidate['name'] or sub_id}")
-
-            # Trigger async analysis
-            if trigger_analysis:
-                threading.Thread(
-                    target=_analyze_candidate_async,
-                    args=(actual_role_id, sub_id),
-                    daemon=True
-                ).start()
-
-        if new_count > 0:
-            _save()
-            print(f"[Sheets] Added {new_count} new candidates from sheet")
-        else:
-            print(f"[Sheets] No new candidates found in sheet")
-
-        return new_count
+    validator_key = (tuple(sorted(target_role_ids)), sheet_url)
+    request_headers = {}
+    if conditional and validator_key in _sheet_validators:
+        etag, last_modified = _sheet_validators[validator_key]
+        if etag:
+            request_headers["If-None-Match"] = etag
+        if last_modified:
+            request_headers["If-Modified-Since"] = last_modified
 
+    try:
+        with sheets_session.get(sheet_url, timeout=(5, 30), headers=request_headers, stream=True) as resp:
+            return _import_csv_response(resp, target_role_ids, trigger_analysis, validator_key)
     except Exception as e:
         print(f"[Sheets] Error fetching sheet: {e}")
         import traceback
@@ -526,31 +851,98 @@ def _import_from_sheet(target_role_id, sheet_url, trigger_analysis=True):
         return 0
 
 
+def _import_csv_response(resp, target_role_ids, trigger_analysis, validator_key) -> int:
+    """Parse a streamed CSV export row by row and add new candidates."""
+    if resp.status_code == 304:
+        print(f"[Sheets] Sheet unchanged since last poll")
+        return 0
+    resp.raise_for_status()
+
+    # Decode straight off the socket; newline="" lets csv handle line breaks inside quoted cells
+    resp.raw.decode_content = True
+    reader = csv.reader(io.TextIOWrapper(resp.raw, encoding="utf-8-sig", newline=""))
+    headers = next(reader, None)
+    if not headers:
+        print(f"[Sheets] Empty response from sheet")
+        return 0
+    print(f"[Sheets] Sheet columns: {headers}")
+    columns = _resolve_sheet_columns(headers)
+
+    added: List[Tuple[str, str]] = []
+    for row_idx, row in enumerate(reader):
+        if not row:
+            continue
+        sub_id = _row_value(row, columns["submission_id"])
+        if not sub_id:
+            # Derive a stable ID from name+email if no submission ID column (blake2b, unlike
+            # hash(), gives the same ID across restarts so the row isn't re-imported)
+            name_val = _row_value(row, columns["name"])
+            email_val = _row_value(row, columns["email"])
+            if name_val or email_val:
+                digest = hashlib.blake2b(f"{name_val}\0{email_val}".encode(), digest_size=4).hexdigest()
+                sub_id = f"sheet_{digest}"
+            else:
+                print(f"[Sheets] Row {row_idx}: no ID and no name/email, skipping")
+                continue
+
+        for target_role_id in target_role_ids:
+            added_to = _add_sheet_row(target_role_id, sub_id, row, columns)
+            if added_to:
+                added.append((added_to, sub_id))
+
+    new_count = len(added)
+    if new_count > 0:
+        print(f"[Sheets] Added {new_count} new candidates from sheet")
+        if trigger_analysis:
+            _analyze_candidates(added)
+    else:
+        print(f"[Sheets] No new candidates found in sheet")
+
+    if resp.headers.get("ETag") or resp.headers.get("Last-Modified"):
+        _sheet_validators[validator_key] = (resp.headers.get("ETag", ""), resp.headers.get("Last-Modified", ""))
+
+    return new_count
+
+
 def _poll_google_sheet():
-    """Periodically fetch Google Sheet CSV and add new candidates."""
+    """
+    Periodically fetch Google Sheet CSVs and add new candidates. Each distinct
+    CSV is fetched once per cycle for all roles importing from it, up to
+    SHEET_POLL_WORKERS sheets at a time so one slow sheet doesn't hold up the
+    rest. Quiet cycles double the wait (up to SHEET_POLL_MAX_INTERVAL); any
+    new row resets it.
+    """
+    interval = SHEET_POLL_INTERVAL
     while True:
+        added = 0
         try:
-            urls_to_check = set()
+            targets_by_url: Dict[str, List[str]] = {}
             if GOOGLE_SHEET_URL:
-                urls_to_check.add(("__global__", GOOGLE_SHEET_URL))
-            for role_id, role in store["roles"].items():
-                if role.get("sheet_url"):
-                    urls_to_check.add((role_id, role["sheet_url"]))
-
-            for target_role_id, sheet_url in urls_to_check:
-                _import_from_sheet(target_role_id, sheet_url)
+                targets_by_url.setdefault(_convert_sheet_url(GOOGLE_SHEET_URL), []).append("__global__")
+            with store_lock:
+                for sheet_url, role_ids in store["sheet_index"].items():
+                    targets_by_url.setdefault(_convert_sheet_url(sheet_url), []).extend(role_ids)
+
+            if targets_by_url:
+                with ThreadPoolExecutor(max_workers=min(SHEET_POLL_WORKERS, len(targets_by_url)),
+                                        thread_name_prefix="sheet-poll") as pool:
+                    added = sum(pool.map(
+                        lambda item: _import_from_sheet(item[1], item[0], conditional=True),
+                        targets_by_url.items(),
+                    ))
 
         except Exception as e:
             print(f"[Sheets] Poller error: {e}")
 
-        time.sleep(SHEET_POLL_INTERVAL)
+        interval = SHEET_POLL_INTERVAL if added else min(interval * 2, SHEET_POLL_MAX_INTERVAL)
+        time.sleep(interval)
 
 
 def start_sheets_poller():
     """Start the Google Sheets polling thread."""
     thread = threading.Thread(target=_poll_google_sheet, daemon=True)
     thread.start()
-    print("[DevModule] Google Sheets poller started (every 5 min)")
+    print("[DevModule] Google Sheets poller started (every 5 min, backing off to 30 min when idle)")
 
 
 # ─── Trigger analysis for a role ──────────────────────────────────────────────
@@ -561,49 +953,49 @@ async def analyze_role_candidates(role_id: str, force: bool = False):
     If force=True, re-analyzes ALL candidates (clears previous results first).
     Otherwise only analyzes un-analyzed candidates.
     """
-    role = store["roles"].get(role_id)
-    if not role:
-        return {"error": "Role not found"}
+    with store_lock:
+        role = store["roles"].get(role_id)
+        if not role:
+            raise HTTPException(status_code=404, detail="Role not found")
+        role_name = role["name"]
+        sheet_url = role.get("sheet_url", "")
 
     # First, try to import new candidates from Google Sheet
     imported = 0
-    sheet_url = role.get("sheet_url", "")
     if sheet_url:
-        print(f"[Analyze] Importing from sheet for role '{role['name']}'...")
-        imported = _import_from_sheet(role_id, sheet_url, trigger_analysis=False)
-        # Re-read role after import (candidates may have been added)
-        role = store["roles"].get(role_id)
+        print(f"[Analyze] Importing from sheet for role '{role_name}'...")
+        imported = _import_from_sheet([role_id], sheet_url, trigger_analysis=False)
 
-    if not role["candidates"]:
-        return {"message": "No candidates found. Check that the Google Sheet is shared publicly (Anyone with the link) and has data."}
-
-    if force:
-        # Force mode: clear old results and re-analyze ALL candidates
-        print(f"[Analyze] FORCE mode — re-analyzing ALL {len(role['candidates'])} candidates for role '{role['name']}'")
-        to_analyze = list(role["candidates"].items())
-        for cid, c in to_analyze:
-            c.pop("evaluation", None)
-            c.pop("github_analysis", None)
-            c.pop("resume_analysis", None)
-        _save()
-    else:
-        # Normal mode: only un-analyzed or incomplete
-        to_analyze = [
-            (cid, c) for cid, c in role["candidates"].items()
-            if not c.get("evaluation")
-            or (c.get("github_username") and not c.get("github_analysis"))
-            or (c.get("resume_url") and not c.get("resume_analysis"))
-        ]
+    with store_lock:
+        # Re-read role after import (candidates may have been added, or the role deleted)
+        role = store["roles"].get(role_id)
+        if not role:
+            raise HTTPException(status_code=404, detail="Role not found")
+        if not role["candidates"]:
+            return {"message": "No candidates found. Check that the Google Sheet is shared publicly (Anyone with the link) and has data."}
+
+        if force:
+            # Force mode: clear old results and re-analyze ALL candidates
+            print(f"[Analyze] FORCE mode — re-analyzing ALL {len(role['candidates'])} candidates for role '{role['name']}'")
+            to_analyze = list(role["candidates"].items())
+            for cid, c in to_analyze:
+                c.pop("evaluation", None)
+                c.pop("github_analysis", None)
+                c.pop("resume_analysis", None)
+            _save_candidates(role_id, [cid for cid, _ in to_analyze])
+        else:
+            # Normal mode: only un-analyzed or incomplete
+            to_analyze = [
+                (cid, c) for cid, c in role["candidates"].items()
+                if not c.get("evaluation")
+                or (c.get("github_username") and not c.get("github_analysis"))
+                or (c.get("resume_url") and not c.get("resume_analysis"))
+            ]
 
     if not to_analyze:
         return {"message": "All candidates already analyzed"}
 
-    for cid, _ in to_analyze:
-        threading.Thread(
-            target=_analyze_candidate_async,
-            args=(role_id, cid),
-            daemon=True
-        ).start()
+    _analyze_candidates([(role_id, cid) for cid, _ in to_analyze])
 
     msg = f"Triggered analysis for {len(to_analyze)} candidate(s)"
     if imported > 0:
@@ -616,13 +1008,13 @@ async def refresh_sheet(role_id: str):
     """Manually trigger Google Sheet import for a role."""
     role = store["roles"].get(role_id)
     if not role:
-        return {"error": "Role not found"}
+        raise HTTPException(status_code=404, detail="Role not found")
 
     sheet_url = role.get("sheet_url", "")
     if not sheet_url:
         return {"message": "No Google Sheet URL configured for this role"}
 
-    imported = _import_from_sheet(role_id, sheet_url, trigger_analysis=True)
+    imported = _import_from_sheet([role_id], sheet_url, trigger_analysis=True)
     total = len(store["roles"].get(role_id, {}).get("candidates", {}))
     return {"message": f"Imported {imported} new candidates ({total} total)", "imported": imported, "total": total}
 
@@ -0,0 +1,165 @@
+"""
+LLM Cache — Local Caches for Gemini Responses
+===============================================
+Persists deterministic model outputs (e.g. per-image vision analyses)
+so re-scrapes and re-runs don't pay for the same Gemini call twice,
+and matches near-duplicate inputs by embedding similarity.
+"""
+
+import os
+import sqlite3
+import threading
+import time
+import math
+from array import array
+from collections import OrderedDict
+from typing import Optional, Sequence, Tuple
+
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache")
+
+
+class DiskCache:
+    """
+    SQLite-backed key/value store with per-entry expiry, safe to share across threads.
+    The most recently used `memory_items` entries are also kept in process so
+    repeat lookups within a run skip SQLite entirely.
+    """
+
+    def __init__(self, path: str, memory_items: int = 256):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.path = path
+        self.memory_items = memory_items
+        self._memory = OrderedDict()  # key -> (value, expires_at)
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS cache ("
+                " key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL)"
+            )
+
+    def _remember(self, key: str, value: str, expires_at: Optional[float]):
+        # Caller holds self._lock
+        if self.memory_items <= 0:
+            return
+        self._memory[key] = (value, expires_at)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_items:
+            self._memory.popitem(last=False)
+
+    def get(self, key: str) -> Optional[str]:
+        """Return the cached value, or None if missing or expired."""
+        try:
+            with self._lock:
+                hit = self._memory.get(key)
+                if hit and (hit[1] is None or hit[1] >= time.time()):
+                    self._memory.move_to_end(key)
+                    self.hits += 1
+                    return hit[0]
+                self._memory.pop(key, None)
+                row = self._conn.execute(
+                    "SELECT value, expires_at FROM cache WHERE key = ?", (key,)
+                ).fetchone()
+                if row and row[1] is not None and row[1] < time.time():
+                    with self._conn:
+                        self._conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+                    row = None
+                if row:
+                    self._remember(key, row[0], row[1])
+                    self.hits += 1
+                else:
+                    self.misses += 1
+        except sqlite3.Error as e:
+            print(f"  [Cache] Read error ({os.path.basename(self.path)}): {e}")
+            return None
+        return row[0] if row else None
+
+    def set(self, key: str, value: str, expire: Optional[float] = None):
+        """Store a value; `expire` is a lifetime in seconds (None keeps it forever)."""
+        expires_at = time.time() + expire if expire else None
+        try:
+            with self._lock, self._conn:
+                self._remember(key, value, expires_at)
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO cache (key, value, expires_at) VALUES (?, ?, ?)",
+                    (key, value, expires_at),
+                )
+        except sqlite3.Error as e:
+            print(f"  [Cache] Write error ({os.path.basename(self.path)}): {e}")
+
+
+class SemanticCache:
+    """
+    SQLite-backed store of (embedding, value) pairs answering nearest-neighbour
+    lookups: `lookup` returns the value whose embedding has the highest cosine
+    similarity to the query, provided it reaches `threshold`.
+
+    Vectors are kept unit-length in memory so similarity is a plain dot
+    product. Only the newest `max_items` entries are searched.
+    """
+
+    def __init__(self, path: str, threshold: float = 0.95, max_items: int = 2000):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.path = path
+        self.threshold = threshold
+        self.max_items = max_items
+        self.hits = 0
+        self.misses = 0
+        self._entries = []  # (unit vector, value), oldest first
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                " id INTEGER PRIMARY KEY AUTOINCREMENT, vector BLOB NOT NULL, value TEXT NOT NULL)"
+            )
+            rows = self._conn.execute(
+                "SELECT vector, value FROM entries ORDER BY id DESC LIMIT ?", (max_items,)
+            ).fetchall()
+        for blob, value in reversed(rows):
+            vector = array("f")
+            vector.frombytes(blob)
+            self._entries.append((vector, value))
+
+    @staticmethod
+    def _unit(values: Sequence[float]) -> array:
+        norm = math.sqrt(sum(v * v for v in values)) or 1.0
+        return array("f", (v / norm for v in values))
+
+    def lookup(self, values: Sequence[float]) -> Tuple[Optional[str], float]:
+        """Return (value, similarity) of the closest entry, or (None, best similarity) below threshold."""
+        query = self._unit(values)
+        best_value, best_score = None, 0.0
+        # Scan a snapshot so concurrent lookups and adds don't queue behind the loop
+        with self._lock:
+            entries = list(self._entries)
+        for vector, value in entries:
+            if len(vector) != len(query):
+                continue
+            score = sum(map(float.__mul__, vector, query))
+            if score > best_score:
+                best_value, best_score = value, score
+        hit = best_value is not None and best_score >= self.threshold
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+        return (best_value if hit else None), best_score
+
+    def add(self, values: Sequence[float], value: str):
+        """Store a value under its embedding."""
+        vector = self._unit(values)
+        try:
+            with self._lock, self._conn:
+                self._conn.execute(
+                    "INSERT INTO entries (vector, value) VALUES (?, ?)", (vector.tobytes(), value)
+                )
+                self._entries.append((vector, value))
+                if len(self._entries) > self.max_items:
+                    del self._entries[: len(self._entries) - self.max_items]
+        except sqlite3.Error as e:
+            print(f"  [Cache] Write error ({os.path.basename(self.path)}): {e}")
+
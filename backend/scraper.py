@@ -74,32 +74,24 @@ def _gemini_text(system: str, user: str, max_tokens: int = 2000) -> str:
     return response.text or ""
 
 
+# Fallback extractors for _parse_json_from_text, tried in order
+_JSON_FENCE = re.compile(r'```(?:json)?\s*(.*?)\s*```', re.DOTALL)
+_JSON_BRACE = re.compile(r'\{.*\}', re.DOTALL)
+_JSON_BRACKET = re.compile(r'\[.*?\]', re.DOTALL)
+
+
 def _parse_json_from_text(text: str):
     """Try several strategies to extract a JSON value from text."""
     try:
         return json.loads(text)
     except json.JSONDecodeError:
         pass
-    if "```json" in text:
-        s = text.find("```json") + 7
-        e = text.find("```", s)
-        try:
-            return json.loads(text[s:e].strip())
-        except Exception:
-            pass
-    if "```" in text:
-        s = text.find("```") + 3
-        e = text.find("```", s)
-        try:
-            return json.loads(text[s:e].strip())
-        except Exception:
-            pass
-    for pattern in (r'\{.*\}', r'\[.*?\]'):
-        m = re.search(pattern, text, re.DOTALL)
+    for pattern in (_JSON_FENCE, _JSON_BRACE, _JSON_BRACKET):
+        m = pattern.search(text)
         if m:
             try:
-                return json.loads(m.group())
-            except Exception:
+                return json.loads(m.group(m.lastindex or 0))
+            except json.JSONDecodeError:
                 pass
     return None
 
@@ -25,7 +25,7 @@ from pydantic import BaseModel
 
 from scraper import run_scraper
 from analyzer import analyze_all_designers
-from dev_module import router as dev_router, start_sheets_poller
+from dev_module import router as dev_router, shutdown_analysis, start_sheets_poller
 
 # ─── App ──────────────────────────────────────────────────────────────────────
 
@@ -51,6 +51,11 @@ app.include_router(dev_router)
 async def startup_event():
     start_sheets_poller()
 
+# Cancel queued candidate analyses so shutdown doesn't wait for the whole backlog
+@app.on_event("shutdown")
+def shutdown_event():
+    shutdown_analysis()
+
 # ─── Designer Data Persistence ────────────────────────────────────────────────
 
 DESIGNERS_DATA_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "designers_data.json")
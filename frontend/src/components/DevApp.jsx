@@ -106,6 +106,10 @@ export default function DevApp({ activeNav }) {
         }
         try {
             const res = await fetch(`${API_BASE}/api/devs/roles/${activeRoleId}`)
+            if (!res.ok) {
+                setActiveRole(null)
+                return
+            }
             const data = await res.json()
             setActiveRole(data)
         } catch (err) {
@@ -150,7 +154,7 @@ export default function DevApp({ activeNav }) {
         try {
             const res = await fetch(`${API_BASE}/api/devs/roles/${activeRoleId}/analyze?force=true`, { method: 'POST' })
             const data = await res.json()
-            alert(data.message || 'Analysis triggered')
+            alert(data.message || data.detail || 'Analysis triggered')
             setLastAnalyzed(new Date())
             fetchRoles()
             fetchRoleDetail()
@@ -168,7 +172,7 @@ export default function DevApp({ activeNav }) {
         try {
             const res = await fetch(`${API_BASE}/api/devs/roles/${activeRoleId}/refresh-sheet`, { method: 'POST' })
             const data = await res.json()
-            alert(data.message || 'Refresh complete')
+            alert(data.message || data.detail || 'Refresh complete')
             fetchRoles()
             fetchRoleDetail()
         } catch (err) {
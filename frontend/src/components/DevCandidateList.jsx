@@ -58,8 +58,8 @@ export default function DevCandidateList({ role, pipelineFilter = 'all', onRefre
                 body: JSON.stringify({ status: newStatus }),
             })
             const data = await res.json()
-            if (data.error) {
-                alert(data.error)
+            if (!res.ok) {
+                alert(data.detail)
             } else {
                 onRefresh?.()
             }
@@ -92,8 +92,8 @@ export default function DevCandidateList({ role, pipelineFilter = 'all', onRefre
                 body: JSON.stringify({ assessment_status: newStage }),
             })
             const data = await res.json()
-            if (data.error) {
-                alert(data.error)
+            if (!res.ok) {
+                alert(data.detail)
             } else {
                 onRefresh?.()
             }